@@ -16,82 +16,215 @@ Usage:
     python claude_player.py --join
 """
 import argparse
+import atexit
+import functools
 import time
 import sys
 import logging
 from typing import Optional, List, Dict, Any
 
+import numpy as np
+
 from zero_ad_client import ZeroADDirectClient, GameState
 from memory_manager import MemoryManager
 from dynamic_actions import DynamicActionGenerator
 from strategic_ai import StrategicAI
+from llm_cache import LLMCache
+from observation_formatter import complete_answer
 from utils import setup_logging, load_config, print_episode_summary
 
 logger = logging.getLogger(__name__)
 
+LLM_CACHE_PATH = "./memory/llm_cache.sqlite"
+
+# Column order of the per-turn resource history
+RESOURCE_TYPES = ("food", "wood", "stone", "metal")
+
 
 class LLMInterface:
     """Interface to LLM (Gemini/Claude) for decision making."""
     
-    def __init__(self, provider: str = "gemini", model: str = None):
+    # Keep-alive settings for the shared HTTP transport. Turns are a few seconds
+    # apart, so idle connections must outlive the default 5s expiry.
+    MAX_KEEPALIVE_CONNECTIONS = 4
+    KEEPALIVE_EXPIRY = 600
+    
+    def __init__(self, provider: str = "gemini", model: str = None, cache: LLMCache = None):
         self.provider = provider
         self.client = None
         self.model = model or "gemini-3-flash-preview"
+        self.cache = cache
+        self._http = None
         self._init_client()
     
     def _init_client(self):
-        """Initialize the LLM client."""
+        """Initialize the LLM client on a pooled keep-alive HTTP transport."""
+        import httpx
+        limits = httpx.Limits(
+            max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=self.KEEPALIVE_EXPIRY,
+        )
+        
         if self.provider == "gemini":
             from google import genai
+            from google.genai import types
             import os
             api_key = os.getenv("GEMINI_API_KEY")
             if not api_key:
                 raise ValueError("GEMINI_API_KEY environment variable not set")
-            self.client = genai.Client(api_key=api_key)
+            self._http = httpx.Client(limits=limits)
+            self.client = genai.Client(
+                api_key=api_key,
+                http_options=types.HttpOptions(httpx_client=self._http),
+            )
             logger.info(f"Initialized Gemini with model {self.model}")
         else:
             import anthropic
             import os
             api_key = os.getenv("ANTHROPIC_API_KEY")
-            self.client = anthropic.Anthropic(api_key=api_key)
+            self._http = anthropic.DefaultHttpxClient(limits=limits)
+            self.client = anthropic.Anthropic(api_key=api_key, http_client=self._http)
             self.model = "claude-sonnet-4-20250514"
             logger.info(f"Initialized Claude with model {self.model}")
     
-    def call(self, prompt: str) -> str:
-        """Call the LLM with a prompt and return response."""
+    def close(self):
+        """Close the pooled HTTP transport."""
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+        self.client = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def __del__(self):
         try:
-            if self.provider == "gemini":
-                from google.genai import types
-                response = self.client.models.generate_content(
-                    model=self.model,
-                    contents=prompt,
-                    config=types.GenerateContentConfig(
-                        temperature=0.3,
-                        max_output_tokens=50,
-                    )
-                )
-                return response.text.strip()
-            else:
-                message = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=50,
-                    temperature=0.3,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return message.content[0].text.strip()
+            self.close()
+        except Exception:
+            pass
+    
+    def call(self, prompt: str, cache: LLMCache = None) -> str:
+        """Call the LLM with a prompt and return response.
+        
+        Identical prompts are answered from the cache when one is attached,
+        either passed here or given to the constructor.
+        """
+        if cache is None:
+            cache = self.cache
+        key = None
+        if cache is not None:
+            key = LLMCache.make_key(self.provider, self.model, prompt)
+            try:
+                cached = cache.get(key)
+            except Exception as e:
+                # e.g. "database is locked" while another game writes the file
+                logger.warning("LLM cache lookup failed: %s", e)
+                cached = None
+            if cached is not None:
+                logger.debug("LLM cache hit")
+                return cached
+        
+        try:
+            response = self._generate(prompt)
         except Exception as e:
-            logger.error(f"LLM call failed: {e}")
+            logger.error("LLM call failed: %s", e)
             return "0"  # Default action
+        
+        if key is not None:
+            try:
+                cache.set(key, response)
+            except Exception as e:
+                logger.warning("LLM cache store failed: %s", e)
+        return response
+    
+    def _generate(self, prompt: str) -> str:
+        """Send the prompt to the provider.
+        
+        The response is streamed and the stream dropped as soon as the answer
+        is complete, rather than waiting for the whole completion.
+        """
+        text = ""
+        if self.provider == "gemini":
+            from google.genai import types
+            stream = self.client.models.generate_content_stream(
+                model=self.model,
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    temperature=0.3,
+                    max_output_tokens=50,
+                )
+            )
+            try:
+                for chunk in stream:
+                    text += chunk.text or ""
+                    answer = complete_answer(text)
+                    if answer is not None:
+                        return answer
+            finally:
+                stream.close()
+            return text.strip()
+        else:
+            # Leaving the stream context early closes the connection
+            with self.client.messages.stream(
+                model=self.model,
+                max_tokens=50,
+                temperature=0.3,
+                messages=[{"role": "user", "content": prompt}]
+            ) as stream:
+                for delta in stream.text_stream:
+                    text += delta
+                    answer = complete_answer(text)
+                    if answer is not None:
+                        return answer
+            return text.strip()
+
+
+_llm_instances: Dict[str, LLMInterface] = {}
+
+
+def get_llm_interface(provider: str = "gemini", model: str = None) -> LLMInterface:
+    """Get the shared LLMInterface for a provider, creating it on first use.
+    
+    Reusing one instance across games keeps its connection pool warm. The
+    shared instances hold no response cache (pass one to call() instead) and
+    are closed at interpreter exit by close_llm_interfaces().
+    """
+    key = f"{provider}:{model or ''}"
+    llm = _llm_instances.get(key)
+    if llm is None or llm.client is None:
+        llm = _llm_instances[key] = LLMInterface(provider=provider, model=model)
+    return llm
+
+
+@atexit.register
+def close_llm_interfaces():
+    """Close every shared LLMInterface."""
+    while _llm_instances:
+        _, llm = _llm_instances.popitem()
+        llm.close()
 
 
 def run_game(
     client: ZeroADDirectClient,
     llm: LLMInterface,
+    cache: LLMCache = None,
     max_turns: int = 200,
     join_existing: bool = False,
     verbose: bool = True,
+    pace: float = 0.3,
+    precision: str = "fine",
 ) -> Dict:
-    """Run a game with the strategic AI."""
+    """
+    Run a game with the strategic AI.
+    
+    Steps are spaced at least `pace` seconds apart so the game visibly
+    advances; time spent deciding (LLM calls) counts towards that interval.
+    precision="coarse" quantizes the per-turn prompt so it hits the LLM cache
+    more often. cache, if given, answers repeated prompts for this game.
+    """
     start_time = time.time()
     
     # Initialize components
@@ -129,10 +262,15 @@ def run_game(
         memory=memory,
         action_generator=action_generator,
         strategic_interval=15,  # Re-evaluate strategy every 15 turns
+        precision=precision,
     )
     
-    total_reward = 0.0
+    # Per-turn history, preallocated for the whole game (row t = turn t+1)
+    unit_counts = np.zeros(max_turns, dtype=np.int32)
+    resources_hist = np.zeros((max_turns, len(RESOURCE_TYPES)), dtype=np.int64)
+    rewards = np.zeros(max_turns, dtype=np.float64)
     done = False
+    next_step_at = 0.0
     
     print("\n🎯 Bismarck AI is now playing...")
     print("=" * 60)
@@ -141,22 +279,32 @@ def run_game(
         # Make decision using two-phase AI
         commands, action_desc = strategic_ai.make_decision(
             state=state,
-            call_llm_func=llm.call,
+            call_llm_func=functools.partial(llm.call, cache=cache),
         )
         
         # Log action
-        print(f"[{strategic_ai.get_status_summary()}] → {action_desc}")
+        if verbose:
+            print(f"[{strategic_ai.get_status_summary()}] → {action_desc}")
+        
+        # Wait out whatever is left of the pacing interval
+        delay = next_step_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
         
         # Execute commands
         try:
             state = client.step(commands)
         except Exception as e:
-            logger.error(f"Game error: {e}")
+            logger.error("Game error: %s", e)
             break
+        next_step_at = time.monotonic() + pace
         
         # Calculate reward (simple version)
-        reward = len(state.my_units) * 0.1 + sum(state.resources.values()) * 0.001
-        total_reward += reward
+        t = strategic_ai.turn_count - 1
+        unit_counts[t] = len(state.my_units)
+        resources_hist[t] = [state.resources.get(r, 0) for r in RESOURCE_TYPES]
+        rewards[t] = 0.1 * unit_counts[t] + 0.001 * resources_hist[t].sum()
+        reward = float(rewards[t])
         
         # Record to memory
         strategic_ai.record_turn_result(state, action_desc, reward)
@@ -170,19 +318,18 @@ def run_game(
         
         # Show progress every 10 turns
         if verbose and strategic_ai.turn_count % 10 == 0:
-            workers = len([u for u in state.my_units if "female" in u["name"].lower()])
-            military = len(state.my_units) - workers
+            workers, military, _ = state.unit_counts()
             print(f"\n--- Turn {strategic_ai.turn_count} Summary ---")
             print(f"    Workers: {workers}, Military: {military}")
             print(f"    Resources: F={state.resources.get('food')}, W={state.resources.get('wood')}")
             print(f"    Strategy: {strategic_ai.current_strategy.upper()}")
-        
-        # Small delay
-        time.sleep(0.3)
     
     # Game finished
     duration = time.time() - start_time
+    turns = strategic_ai.turn_count
+    total_reward = float(rewards[:turns].sum())
     memory.save_game_summary("completed")
+    memory.close()
     
     print_episode_summary(
         episode_num=1,
@@ -195,11 +342,89 @@ def run_game(
     return {
         "turns": strategic_ai.turn_count,
         "reward": total_reward,
+        "stats": _game_stats(unit_counts[:turns], resources_hist[:turns], rewards[:turns]),
         "duration": duration,
         "final_strategy": strategic_ai.current_strategy,
+        "skipped_llm_turns": strategic_ai.skipped_llm_turns,
     }
 
 
+def _game_stats(
+    unit_counts: np.ndarray,
+    resources_hist: np.ndarray,
+    rewards: np.ndarray,
+) -> Dict[str, Any]:
+    """Aggregate statistics over a game's per-turn history arrays."""
+    if len(rewards) == 0:
+        return {}
+    
+    # Average per-turn change of each resource
+    rates = np.diff(resources_hist, axis=0).mean(axis=0) if len(resources_hist) > 1 else np.zeros(len(RESOURCE_TYPES))
+    
+    return {
+        "mean_reward": float(rewards.mean()),
+        "peak_units": int(unit_counts.max()),
+        "resource_rates": {r: float(v) for r, v in zip(RESOURCE_TYPES, rates)},
+    }
+
+
+def play_game(
+    host: str,
+    port: int,
+    provider: str = "gemini",
+    use_cache: bool = True,
+    **game_options,
+) -> Dict:
+    """
+    Connect to one 0 AD instance and play a game on it.
+    
+    Opens its own client and cache and plays through the process's shared
+    LLM interface, so it can run in a worker process (see --games).
+    game_options are passed on to run_game.
+    """
+    client = ZeroADDirectClient(host, port)
+    if not client.connect():
+        return {"error": f"Could not connect to 0 AD at {host}:{port}"}
+    
+    cache = LLMCache(path=LLM_CACHE_PATH) if use_cache else None
+    llm = get_llm_interface(provider=provider)
+    try:
+        return run_game(client=client, llm=llm, cache=cache, **game_options)
+    finally:
+        client.close()
+        if cache is not None:
+            logger.info("LLM cache: %d hits, %d misses", cache.hits, cache.misses)
+            cache.close()
+
+
+def play_games(host: str, base_port: int, games: int, **options) -> List[Dict]:
+    """
+    Play several games at once, one worker process per 0 AD instance.
+    
+    Game i connects to base_port + i, so each instance must be started with
+    its own --rl-interface port. Games are I/O bound (LLM + RL interface), so
+    running them side by side divides wall-clock time by roughly `games`.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
+    with ProcessPoolExecutor(max_workers=games) as pool:
+        futures = [
+            pool.submit(play_game, host, base_port + i, **options)
+            for i in range(games)
+        ]
+        
+        # A game that crashed is reported like one that couldn't start, so it
+        # doesn't discard the other games' results
+        results = []
+        for i, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error("Game on port %d failed: %s", base_port + i, e)
+                results.append({"error": str(e)})
+        return results
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Bismarck - Advanced AI for 0 A.D.",
@@ -218,6 +443,12 @@ Examples:
     parser.add_argument("--provider", choices=["gemini", "anthropic"], default="gemini")
     parser.add_argument("--verbose", "-v", action="store_true", default=True)
     parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--pace", type=float, default=0.3, help="Minimum seconds between game steps")
+    parser.add_argument("--precision", choices=["fine", "coarse"], default="fine",
+                        help="coarse: quantize per-turn prompts for more cache hits")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the LLM response cache")
+    parser.add_argument("--games", type=int, default=1,
+                        help="Play N games in parallel on ports --port .. --port+N-1")
     
     args = parser.parse_args()
     
@@ -231,31 +462,36 @@ Examples:
     print("  Features: Strategic Planning | Dynamic Actions | Memory")
     print("=" * 60)
     
-    # Connect to 0 AD
-    client = ZeroADDirectClient(args.host, args.port)
-    
-    if not client.connect():
-        print("\n❌ Could not connect to 0 AD")
-        print('\nStart 0 AD with:')
-        print('  "/Applications/0 A.D..app/Contents/MacOS/pyrogenesis" --rl-interface=127.0.0.1:6000')
-        sys.exit(1)
-    
-    # Initialize LLM
-    llm = LLMInterface(provider=args.provider)
+    options = dict(
+        provider=args.provider,
+        use_cache=not args.no_cache,
+        max_turns=args.turns,
+        join_existing=args.join,
+        verbose=args.verbose,
+        pace=args.pace,
+        precision=args.precision,
+    )
     
     try:
-        result = run_game(
-            client=client,
-            llm=llm,
-            max_turns=args.turns,
-            join_existing=args.join,
-            verbose=args.verbose,
-        )
-        print(f"\n✓ Game completed! Final strategy: {result.get('final_strategy', 'unknown').upper()}")
+        if args.games > 1:
+            results = play_games(args.host, args.port, args.games, **options)
+        else:
+            results = [play_game(args.host, args.port, **options)]
     except KeyboardInterrupt:
         print("\n\n⏹️ Stopped by user")
-    finally:
-        client.close()
+        return
+    
+    for i, result in enumerate(results):
+        port = args.port + i
+        if "error" in result:
+            print(f"\n❌ Game on port {port}: {result['error']}")
+            print('\nStart 0 AD with:')
+            print(f'  "/Applications/0 A.D..app/Contents/MacOS/pyrogenesis" --rl-interface=127.0.0.1:{port}')
+        else:
+            print(f"\n✓ Game on port {port} completed! Final strategy: {result.get('final_strategy', 'unknown').upper()}")
+    
+    if all("error" in result for result in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
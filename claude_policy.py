@@ -6,22 +6,33 @@ Uses conversation history for context and strategic continuity.
 """
 import os
 import time
+import asyncio
 import random
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+import weakref
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple, Deque
 from dataclasses import dataclass, field
 
+import numpy as np
+
+from llm_cache import LLMCache, SimilarityCache
 from observation_formatter import (
     simplify_observation,
+    observation_vector,
     create_claude_prompt,
+    create_batch_prompt,
     extract_action_from_response,
+    extract_actions_from_response,
+    complete_answer,
     get_default_action_descriptions,
 )
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class TurnHistory:
     """Record of a single turn."""
     turn: int
@@ -37,6 +48,112 @@ class TurnHistory:
         }
 
 
+class RingHistory:
+    """
+    Turn history in fixed-size parallel arrays; the oldest turn is overwritten.
+    
+    Statistics run over the arrays directly. The last few turns are also kept
+    as the dicts the prompt takes, built once on append.
+    """
+    
+    # Turns kept ready for the prompt
+    PROMPT_TURNS = 5
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.turns = np.zeros(capacity, dtype=np.int32)
+        self.actions = np.zeros(capacity, dtype=np.int32)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.summaries: Deque[str] = deque(maxlen=capacity)  # oldest first
+        self.prompt_dicts: Deque[Dict] = deque(maxlen=self.PROMPT_TURNS)  # TurnHistory.to_dict() form
+        self.head = 0  # next slot to write
+        self.size = 0
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def append(self, turn: int, action: int, observation_summary: str, reward: float = 0.0):
+        i = self.head
+        self.turns[i], self.actions[i], self.rewards[i] = turn, action, reward
+        self.summaries.append(observation_summary)
+        self.prompt_dicts.append({"turn": turn, "action": action, "reward": reward})
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+    
+    def set_last_reward(self, reward: float):
+        if self.size:
+            self.rewards[self.head - 1] = reward
+            self.prompt_dicts[-1]["reward"] = reward
+    
+    def recent(self, n: int) -> List[TurnHistory]:
+        """The last n turns, oldest first."""
+        n = min(n, self.size)
+        if n <= 0:
+            return []
+        slots = (self.head - n + np.arange(n)) % self.capacity
+        summaries = list(self.summaries)[-n:]
+        return [
+            TurnHistory(int(self.turns[i]), summary, int(self.actions[i]), float(self.rewards[i]))
+            for i, summary in zip(slots, summaries)
+        ]
+    
+    def total_reward(self) -> float:
+        # Until the ring wraps, the filled slots are exactly [:size]
+        return float(self.rewards[:self.size].sum())
+    
+    def most_common_action(self) -> Tuple[int, int]:
+        """(action, times used); a tie goes to the action used first."""
+        # Oldest first, so argmax finds the earliest of the tied actions
+        actions = self.actions[(self.head - self.size + np.arange(self.size)) % self.capacity]
+        counts = np.bincount(actions)
+        top = counts.max()
+        action = int(actions[np.argmax(counts[actions] == top)])
+        return action, int(top)
+    
+    def clear(self):
+        self.head = self.size = 0
+        self.rewards[:] = 0
+        self.summaries.clear()
+        self.prompt_dicts.clear()
+
+
+@dataclass
+class Endpoint:
+    """One provider client in ClaudePolicy's endpoint pool."""
+    provider: str
+    model: str
+    client: Any
+    http: Any = None  # pooled HTTP transport, closed with the policy
+    api_key: Optional[str] = None
+    concurrency_limit: int = 4  # max requests in flight on this endpoint
+    inflight: int = 0  # requests holding or waiting for a slot
+    unhealthy_until: float = 0.0  # time.monotonic() deadline after a failure
+    prefix_cache: Optional[str] = None  # Gemini context cache holding the system prompt
+    users: int = 0  # policies holding this endpoint; closed when the last one closes
+    slots: threading.BoundedSemaphore = field(init=False, repr=False)  # for sync calls
+    
+    def __post_init__(self):
+        self.slots = threading.BoundedSemaphore(self.concurrency_limit)
+
+
+def _require_text(text: Optional[str]) -> str:
+    """A Gemini reply's text, raising if it is empty.
+    
+    That happens when thinking uses up max_output_tokens. Raising makes it a
+    failed call, retried and counted by the breaker, rather than an
+    unparseable answer.
+    """
+    if not text or not text.strip():
+        raise ValueError("Gemini returned no text (thinking may have used up max_output_tokens)")
+    return text
+
+
+# Endpoints shared by policies with the same provider, model, key and system
+# prompt, so an eval harness running many policies reuses one client and its
+# keep-alive pool
+_SHARED_ENDPOINTS: "weakref.WeakValueDictionary[tuple, Endpoint]" = weakref.WeakValueDictionary()
+
+
 class ClaudePolicy:
     """
     AI policy that uses Claude or Gemini to make game decisions.
@@ -46,6 +163,43 @@ class ClaudePolicy:
     - Google Gemini API (fallback/alternative)
     """
     
+    # Keep-alive settings for the pooled HTTP transport, so the TLS
+    # handshake is paid once rather than on every turn
+    MAX_KEEPALIVE_CONNECTIONS = 8
+    KEEPALIVE_EXPIRY = 60
+    HTTP_TIMEOUT = 10
+    
+    # The answer is a single action number, i.e. one or two tokens
+    MAX_ANSWER_TOKENS = 4
+    # Per state in a batched answer ("12: 3" plus newline)
+    MAX_BATCH_LINE_TOKENS = 6
+    # Gemini 3 counts thinking towards max_output_tokens, and even MINIMAL
+    # thinking can spend a few tokens, so its budget gets this headroom on
+    # top of the answer. Streams are dropped once the answer is read, so
+    # unused headroom costs nothing.
+    GEMINI_THINKING_TOKENS = 256
+    
+    # Circuit breaker: with this many failures among the last BREAKER_WINDOW
+    # API calls, skip the API and use default actions for BREAKER_COOLDOWN
+    BREAKER_WINDOW = 10
+    BREAKER_FAILURES = 7
+    BREAKER_COOLDOWN = 30.0
+    
+    SYSTEM_PROMPT = "You are playing a real-time strategy game. Choose actions by responding with ONLY a number."
+    
+    # Providers won't cache a prefix much below ~1024 tokens, so shorter
+    # system prompts are just sent inline
+    MIN_CACHED_PREFIX_CHARS = 4096
+    
+    # Lifetime of the Gemini context cache created for the system prompt
+    PREFIX_CACHE_TTL = "3600s"
+    
+    # Models for fallback endpoints of another provider
+    FALLBACK_MODELS = {
+        "anthropic": "claude-sonnet-4-20250514",
+        "gemini": "gemini-3-flash-preview",
+    }
+    
     def __init__(
         self,
         api_key: str = None,
@@ -55,6 +209,13 @@ class ClaudePolicy:
         temperature: float = 0.3,
         max_retries: int = 3,
         retry_delay: float = 1.0,
+        enable_cache: bool = True,
+        cache_path: Optional[str] = None,
+        similarity_threshold: Optional[float] = None,
+        hedge_delay: Optional[float] = None,
+        fallback_providers: Optional[List[str]] = None,
+        cooldown_seconds: float = 30.0,
+        system_prompt: Optional[str] = None,
     ):
         """
         Initialize the AI policy.
@@ -67,6 +228,19 @@ class ClaudePolicy:
             temperature: Sampling temperature
             max_retries: Number of API retry attempts
             retry_delay: Base delay between retries
+            enable_cache: Reuse the action chosen for an identical prompt
+            cache_path: SQLite file to persist the cache in (memory only if None)
+            similarity_threshold: If set, reuse the action of a previous state
+                whose features have at least this cosine similarity (e.g. 0.95)
+            hedge_delay: Seconds before get_action_async also sends the
+                request to another endpoint if the first hasn't answered
+                (default retry_delay / 2; needs fallback_providers)
+            fallback_providers: Extra providers to pool with the primary one;
+                calls go to the least loaded healthy endpoint
+            cooldown_seconds: How long a failed endpoint is skipped
+            system_prompt: Static instructions sent ahead of every prompt
+                (e.g. game_knowledge.GAME_KNOWLEDGE_PROMPT); cached
+                provider-side so only the per-turn prompt is reprocessed
         """
         self.provider = provider.lower()
         self.model = model
@@ -74,64 +248,253 @@ class ClaudePolicy:
         self.temperature = temperature
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.hedge_delay = retry_delay / 2 if hedge_delay is None else hedge_delay
+        self.cooldown_seconds = cooldown_seconds
+        self.system_prompt = system_prompt or self.SYSTEM_PROMPT
         
-        self.history: List[TurnHistory] = []
+        self.history = RingHistory(max_history)
         self.turn_count = 0
         self.client = None
+        self.endpoints: List[Endpoint] = []
+        self._http = None
+        self._async = None  # (event loop, {id(endpoint): (async client, semaphore)}, closer tasks)
+        self._recent_failures: Deque[bool] = deque(maxlen=self.BREAKER_WINDOW)
+        self._breaker_open_until = 0.0
         self.action_descriptions: List[str] = []
+        self.cache = LLMCache(path=cache_path) if enable_cache else None
+        self.similar = SimilarityCache(similarity_threshold) if similarity_threshold else None
         
-        # Initialize API client
+        # Initialize API clients
         self._init_client(api_key)
+        for provider in fallback_providers or []:
+            try:
+                self.endpoints.append(self._create_endpoint(provider.lower()))
+            except Exception as e:
+                logger.warning("Skipping %s endpoint: %s", provider, e)
     
     def _init_client(self, api_key: str = None):
-        """Initialize the appropriate API client."""
-        if self.provider == "anthropic":
+        """Initialize the primary API client."""
+        endpoint = self._create_endpoint(self.provider, api_key)
+        self.provider, self.model = endpoint.provider, endpoint.model
+        self.client, self._http = endpoint.client, endpoint.http
+        self.endpoints = [endpoint]
+    
+    def _create_endpoint(self, provider: str, api_key: str = None) -> Endpoint:
+        """Get the endpoint for a provider, shared with other policies configured alike."""
+        env_var = "ANTHROPIC_API_KEY" if provider == "anthropic" else "GEMINI_API_KEY"
+        key = (
+            provider,
+            self.model if provider == self.provider else None,
+            api_key or os.getenv(env_var),
+            self.system_prompt,
+        )
+        endpoint = _SHARED_ENDPOINTS.get(key)
+        if endpoint is None:
+            endpoint = self._connect(provider, api_key)
+            _SHARED_ENDPOINTS[key] = endpoint
+        endpoint.users += 1
+        return endpoint
+    
+    def _connect(self, provider: str, api_key: str = None) -> Endpoint:
+        """Create the API client for a provider on a pooled HTTP transport."""
+        import httpx
+        limits = httpx.Limits(
+            max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=self.KEEPALIVE_EXPIRY,
+        )
+        
+        if provider == "anthropic":
             try:
                 import anthropic
                 key = api_key or os.getenv("ANTHROPIC_API_KEY")
                 if not key:
                     raise ValueError("ANTHROPIC_API_KEY not set")
-                self.client = anthropic.Anthropic(api_key=key)
-                logger.info(f"Initialized Anthropic client with model {self.model}")
+                model = self.model if provider == self.provider else self.FALLBACK_MODELS[provider]
+                http = anthropic.DefaultHttpxClient(limits=limits, timeout=self.HTTP_TIMEOUT)
+                client = anthropic.Anthropic(api_key=key, http_client=http)
+                logger.info(f"Initialized Anthropic client with model {model}")
+                return Endpoint(provider, model, client, http=http, api_key=key)
             except ImportError:
                 logger.warning("anthropic package not found, falling back to Gemini")
-                self.provider = "gemini"
-                self._init_client(api_key)
+                return self._connect("gemini", api_key)
         else:
             # Default to Gemini
             from google import genai
+            from google.genai import types
             key = api_key or os.getenv("GEMINI_API_KEY")
             if not key:
                 raise ValueError("GEMINI_API_KEY environment variable not set")
-            self.client = genai.Client(api_key=key)
-            self.model = "gemini-3-flash-preview"
-            logger.info(f"Initialized Gemini client with model {self.model}")
+            http = httpx.Client(limits=limits, timeout=self.HTTP_TIMEOUT)
+            client = genai.Client(
+                api_key=key,
+                http_options=types.HttpOptions(httpx_client=http),
+            )
+            model = self.FALLBACK_MODELS["gemini"]
+            logger.info(f"Initialized Gemini client with model {model}")
+            return Endpoint(
+                "gemini", model, client, http=http, api_key=key,
+                prefix_cache=self._create_prefix_cache(client, model),
+            )
+    
+    def _create_prefix_cache(self, client, model: str) -> Optional[str]:
+        """Create a Gemini context cache for the system prompt.
+        
+        Returns the cache name, or None if the prompt is too short to be
+        cached or caching is unavailable; it is then sent inline.
+        """
+        if len(self.system_prompt) < self.MIN_CACHED_PREFIX_CHARS:
+            return None
+        from google.genai import types
+        try:
+            cached = client.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=self.system_prompt,
+                    ttl=self.PREFIX_CACHE_TTL,
+                ),
+            )
+            logger.info(f"Created context cache {cached.name}")
+            return cached.name
+        except Exception as e:
+            logger.debug("Context caching unavailable, sending system prompt inline: %s", e)
+            return None
+    
+    def close(self):
+        """Release the endpoints, closing those no other policy still uses."""
+        for endpoint in self.endpoints:
+            endpoint.users -= 1
+            if endpoint.users > 0:
+                continue
+            for key, shared in list(_SHARED_ENDPOINTS.items()):
+                if shared is endpoint:
+                    del _SHARED_ENDPOINTS[key]
+            if endpoint.prefix_cache is not None:
+                try:
+                    endpoint.client.caches.delete(name=endpoint.prefix_cache)
+                except Exception as e:
+                    logger.debug("Could not delete context cache %s: %s", endpoint.prefix_cache, e)
+                endpoint.prefix_cache = None
+            if endpoint.http is not None:
+                endpoint.http.close()
+                endpoint.http = None
+        self._close_async()
+        self.endpoints = []
+        self._http = None
+        self.client = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
     
     def get_action(self, observation: Dict[str, Any], env=None) -> int:
         """
         Given game observation, ask AI for action.
         
         Args:
-            observation: Dict from env with game state
+            observation: Dict from env with game state, or a GameState from
+                ZeroADDirectClient (used as-is, without building a dict)
             env: Gym environment (for action space)
             
         Returns:
             action: Integer action ID valid for the action space
         """
-        self.turn_count += 1
+        simplified, prompt, action_space, state_vec = self._prepare_turn(observation, env)
+        
+        # Call AI with retries
+        action = self._call_ai_with_retry(prompt, action_space, state_vec)
+        
+        self._record_turn(simplified, action)
+        return action
+    
+    async def get_action_async(self, observation: Dict[str, Any], env=None) -> int:
+        """
+        Async get_action() with hedged requests.
+        
+        If the API hasn't answered within hedge_delay, the request is also
+        sent to another endpoint of the pool (see fallback_providers) and
+        whichever returns a valid action first wins, which cuts the tail
+        latency of slow or stuck calls. Run it with asyncio.run() from a
+        synchronous loop.
+        """
+        simplified, prompt, action_space, state_vec = self._prepare_turn(observation, env)
+        
+        action = await self._call_ai_with_retry_async(prompt, action_space, state_vec)
+        
+        self._record_turn(simplified, action)
+        return action
+    
+    def get_actions_batch(self, observations: List[Dict[str, Any]], env=None) -> List[int]:
+        """
+        Decide several independent observations with a single request.
+        
+        The action list and instructions are sent once and the model replies
+        with one "<state>: <action>" line per observation, which amortizes
+        the prompt and HTTP overhead across the batch. States the reply
+        doesn't cover get the default action.
+        """
+        if not observations:
+            return []
         action_space = env.action_space if env else None
+        self._load_action_descriptions(env)
         
-        # Simplify observation
-        simplified = simplify_observation(observation, env)
+        simplified = [simplify_observation(obs, env) for obs in observations]
+        prompt = create_batch_prompt(simplified, action_space, self.action_descriptions)
+        max_tokens = self.MAX_BATCH_LINE_TOKENS * len(observations) + self.MAX_ANSWER_TOKENS
         
-        # Get action descriptions
+        actions: List[Optional[int]] = [None] * len(observations)
+        for attempt in range(self.max_retries):
+            if self._breaker_open():
+                break
+            try:
+                response = self._call_ai_full(prompt, max_tokens)
+                self._record_call(failed=False)
+                actions = extract_actions_from_response(response, len(observations), action_space)
+                if any(a is not None for a in actions):
+                    break
+                logger.warning("Could not parse batch actions from: %.100s", response)
+            except Exception as e:
+                logger.error("API error (attempt %d): %s", attempt + 1, e)
+                self._record_call(failed=True)
+                if attempt < self.max_retries - 1 and not self._breaker_open():
+                    time.sleep(self._backoff_delay(attempt))
+        
+        results = []
+        for obs_simplified, action in zip(simplified, actions):
+            if action is None:
+                action = self._get_default_action(action_space)
+            self.turn_count += 1
+            self._record_turn(obs_simplified, action)
+            results.append(action)
+        return results
+    
+    def _load_action_descriptions(self, env):
+        """Pick action descriptions for the env the first time we see it."""
         if not self.action_descriptions and env:
             env_name = getattr(env, 'spec', None)
             env_name = env_name.id if env_name else "unknown"
             self.action_descriptions = get_default_action_descriptions(env_name)
+    
+    def _prepare_turn(self, observation: Dict[str, Any], env):
+        """Start a turn: returns (simplified obs, prompt, action space, state vector)."""
+        self.turn_count += 1
+        action_space = env.action_space if env else None
+        
+        # Simplify observation
+        simplified = simplify_observation(observation, env)
+        
+        # Get action descriptions
+        self._load_action_descriptions(env)
         
         # Create prompt
-        history_dicts = [h.to_dict() for h in self.history[-5:]]
+        history_dicts = list(self.history.prompt_dicts)
         prompt = create_claude_prompt(
             simplified,
             action_space,
@@ -139,78 +502,420 @@ class ClaudePolicy:
             history_dicts
         )
         
-        # Call AI with retries
-        action = self._call_ai_with_retry(prompt, action_space)
-        
-        # Record history
-        self.history.append(TurnHistory(
+        state_vec = observation_vector(simplified) if self.similar is not None else None
+        return simplified, prompt, action_space, state_vec
+    
+    def _record_turn(self, simplified: Dict[str, Any], action: int):
+        """Record the chosen action in the history."""
+        self.history.append(
             turn=self.turn_count,
-            observation_summary=f"Units: {len(simplified.get('my_units', []))} vs {len(simplified.get('enemy_units', []))}",
             action=action,
-        ))
-        
-        # Trim history
-        if len(self.history) > self.max_history * 2:
-            self.history = self.history[-self.max_history:]
+            observation_summary=f"Units: {len(simplified.get('my_units', []))} vs {len(simplified.get('enemy_units', []))}",
+        )
         
-        logger.info(f"Turn {self.turn_count}: Selected action {action}")
-        return action
+        logger.info("Turn %d: Selected action %s", self.turn_count, action)
     
-    def _call_ai_with_retry(self, prompt: str, action_space) -> int:
-        """Call AI with exponential backoff retry."""
+    def _call_ai_with_retry(self, prompt: str, action_space, state_vec=None) -> int:
+        """Call AI with exponential backoff retry.
+        
+        Actions parsed for a prompt are cached, so an identical prompt skips
+        the API; with state_vec, a close enough earlier state does too.
+        Fallback defaults are never cached.
+        """
+        key, cached = self._lookup_cached(prompt, state_vec)
+        if cached is not None:
+            return cached
+        
         for attempt in range(self.max_retries):
+            if self._breaker_open():
+                break
             try:
                 response = self._call_ai(prompt)
+                self._record_call(failed=False)
                 action = extract_action_from_response(response, action_space)
                 
                 if action is not None:
+                    self._store_cached(key, state_vec, action)
                     return action
                 
-                logger.warning(f"Could not parse action from: {response[:100]}")
+                logger.warning("Could not parse action from: %.100s", response)
                 
             except Exception as e:
-                logger.error(f"API error (attempt {attempt + 1}): {e}")
-                if attempt < self.max_retries - 1:
-                    delay = self.retry_delay * (2 ** attempt)
-                    time.sleep(delay)
+                logger.error("API error (attempt %d): %s", attempt + 1, e)
+                self._record_call(failed=True)
+                if attempt < self.max_retries - 1 and not self._breaker_open():
+                    time.sleep(self._backoff_delay(attempt))
         
         # Fallback to random action
         default = self._get_default_action(action_space)
-        logger.warning(f"Using default action: {default}")
+        logger.warning("Using default action: %s", default)
         return default
     
+    async def _call_ai_with_retry_async(self, prompt: str, action_space, state_vec=None) -> int:
+        """Async _call_ai_with_retry(), with each attempt hedged."""
+        key, cached = self._lookup_cached(prompt, state_vec)
+        if cached is not None:
+            return cached
+        
+        for attempt in range(self.max_retries):
+            if self._breaker_open():
+                break
+            action = await self._call_ai_hedged(prompt, action_space)
+            if action is not None:
+                self._store_cached(key, state_vec, action)
+                return action
+            
+            if attempt < self.max_retries - 1 and not self._breaker_open():
+                await asyncio.sleep(self._backoff_delay(attempt))
+        
+        # Fallback to random action
+        default = self._get_default_action(action_space)
+        logger.warning("Using default action: %s", default)
+        return default
+    
+    async def _call_ai_hedged(self, prompt: str, action_space) -> Optional[int]:
+        """
+        One attempt: the request, plus the same request on another endpoint
+        after hedge_delay.
+        
+        A duplicate on the same endpoint would double the cost without getting
+        around a slow upstream, so with a single endpoint nothing is hedged.
+        Returns the first valid parsed action, or None if every request
+        failed. Whatever is still in flight is cancelled.
+        """
+        first = self._pick_endpoint()
+        pending = {asyncio.ensure_future(self._call_ai_async(prompt, first))}
+        hedged = False
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=None if hedged else self.hedge_delay,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    hedged = True
+                    endpoint = self._pick_endpoint(exclude=first)
+                    if endpoint is not None:
+                        logger.debug("No answer after %.2fs, hedging on %s", self.hedge_delay, endpoint.provider)
+                        pending.add(asyncio.ensure_future(self._call_ai_async(prompt, endpoint)))
+                    continue
+                
+                for task in done:
+                    self._record_call(failed=task.exception() is not None)
+                    if task.exception() is not None:
+                        logger.error("API error: %s", task.exception())
+                        continue
+                    action = extract_action_from_response(task.result(), action_space)
+                    if action is not None:
+                        return action
+                    logger.warning("Could not parse action from: %.100s", task.result())
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """Jittered exponential backoff, capped at 3x retry_delay.
+        
+        The jitter keeps clients that failed together from retrying together.
+        """
+        return min(self.retry_delay * 3, random.uniform(self.retry_delay, self.retry_delay * 3 * (2 ** attempt)))
+    
+    def _breaker_open(self) -> bool:
+        return time.monotonic() < self._breaker_open_until
+    
+    def _record_call(self, failed: bool):
+        """Track an API call's outcome, tripping the breaker on repeated failures."""
+        self._recent_failures.append(failed)
+        if sum(self._recent_failures) >= self.BREAKER_FAILURES:
+            self._breaker_open_until = time.monotonic() + self.BREAKER_COOLDOWN
+            self._recent_failures.clear()
+            logger.warning("API failing repeatedly, using default actions for %.0fs", self.BREAKER_COOLDOWN)
+    
+    def _lookup_cached(self, prompt: str, state_vec=None):
+        """Returns (cache key, cached action or None)."""
+        key = None
+        if self.cache is not None:
+            key = LLMCache.make_key(
+                self.provider, self.model, str(self.temperature), self.system_prompt, prompt
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                return key, int(cached)
+        
+        if state_vec is not None:
+            similar = self.similar.get(state_vec)
+            if similar is not None:
+                return key, similar
+        
+        return key, None
+    
+    def _store_cached(self, key: Optional[str], state_vec, action: int):
+        if key is not None:
+            self.cache.set(key, str(action))
+        if state_vec is not None:
+            self.similar.set(state_vec, action)
+    
     def _call_ai(self, prompt: str) -> str:
-        """Call the AI API and get response."""
-        if self.provider == "anthropic":
-            return self._call_anthropic(prompt)
-        else:
-            return self._call_gemini(prompt)
+        """Call the AI API on the least loaded healthy endpoint, streaming the answer."""
+        def call(endpoint: Endpoint) -> str:
+            if endpoint.provider == "anthropic":
+                return self._call_anthropic(prompt, endpoint)
+            return self._call_gemini(prompt, endpoint)
+        return self._on_endpoint(call)
+    
+    def _call_ai_full(self, prompt: str, max_tokens: int) -> str:
+        """Call the AI API for a multi-line answer (no streaming cut-off)."""
+        def call(endpoint: Endpoint) -> str:
+            if endpoint.provider == "anthropic":
+                request = self._anthropic_request(prompt, max_tokens, endpoint=endpoint)
+                return endpoint.client.messages.create(**request).content[0].text
+            request = self._gemini_request(prompt, max_tokens, stop_at_newline=False, endpoint=endpoint)
+            return _require_text(endpoint.client.models.generate_content(**request).text)
+        return self._on_endpoint(call)
+    
+    def _on_endpoint(self, call):
+        """Run call(endpoint) on the least loaded healthy endpoint.
+        
+        The call waits for one of the endpoint's concurrency_limit slots. An
+        endpoint that fails is skipped for cooldown_seconds, so the next
+        retry fails over to another one.
+        """
+        endpoint = self._pick_endpoint()
+        endpoint.inflight += 1
+        try:
+            with endpoint.slots:
+                return call(endpoint)
+        except Exception:
+            self._cool_down(endpoint)
+            raise
+        finally:
+            endpoint.inflight -= 1
+    
+    def _pick_endpoint(self, exclude: Endpoint = None) -> Optional[Endpoint]:
+        """Least loaded endpoint not in cooldown (any endpoint if all are).
+        
+        Load is inflight / concurrency_limit, counted across every policy and
+        thread sharing the endpoint; ties go to the earlier endpoint. A lone
+        policy making one call at a time therefore uses the primary endpoint
+        and fails over in order. None if exclude was the only endpoint.
+        """
+        now = time.monotonic()
+        candidates = [e for e in self.endpoints if e is not exclude]
+        if not candidates:
+            return None
+        healthy = [e for e in candidates if e.unhealthy_until <= now] or candidates
+        return min(healthy, key=lambda e: e.inflight / e.concurrency_limit)
+    
+    def _cool_down(self, endpoint: Endpoint):
+        """Skip a failed endpoint for cooldown_seconds, if there is another to use."""
+        if len(self.endpoints) > 1:
+            endpoint.unhealthy_until = time.monotonic() + self.cooldown_seconds
+            logger.warning("%s endpoint failed, skipping it for %.0fs",
+                           endpoint.provider, self.cooldown_seconds)
+    
+    async def _call_ai_async(self, prompt: str, endpoint: Endpoint) -> str:
+        """Async _call_ai() on a given endpoint: same slots and cooldown, streamed on its async client."""
+        client, semaphore = await self._async_resources(endpoint)
+        endpoint.inflight += 1
+        try:
+            async with semaphore:
+                return await self._stream_async(prompt, endpoint, client)
+        except Exception:
+            self._cool_down(endpoint)
+            raise
+        finally:
+            endpoint.inflight -= 1
+    
+    async def _stream_async(self, prompt: str, endpoint: Endpoint, client) -> str:
+        """Stream an answer from an endpoint's async client, stopping once the number is read."""
+        text = ""
+        if endpoint.provider == "anthropic":
+            request = self._anthropic_request(prompt, endpoint=endpoint)
+            async with client.messages.stream(**request) as stream:
+                async for delta in stream.text_stream:
+                    text += delta
+                    answer = complete_answer(text)
+                    if answer is not None:
+                        return answer
+            return text
+        
+        stream = await client.models.generate_content_stream(**self._gemini_request(prompt, endpoint=endpoint))
+        try:
+            async for chunk in stream:
+                text += chunk.text or ""
+                answer = complete_answer(text)
+                if answer is not None:
+                    return answer
+        finally:
+            await stream.aclose()
+        return _require_text(text)
+    
+    async def _async_resources(self, endpoint: Endpoint):
+        """
+        An endpoint's async client and in-flight limiter for the running event loop.
+        
+        Both are bound to a loop (the client's connections live on it), so
+        they are rebuilt when called from a new one, e.g. one asyncio.run()
+        per turn. The limiter allows the endpoint's concurrency_limit
+        requests at once. Each client is closed inside its own loop:
+        asyncio.run() cancels leftover tasks before closing the loop, which
+        runs the closer task started here. Moving to a new loop closes the
+        previous loop's clients (see _close_async()).
+        """
+        loop = asyncio.get_running_loop()
+        if self._async is None or self._async[0] is not loop:
+            self._close_async()
+            self._async = (loop, {}, [])
+        _, resources, closers = self._async
+        if id(endpoint) not in resources:
+            client, aclose = self._create_async_client(endpoint)
+            closers.append(loop.create_task(self._close_when_cancelled(aclose)))
+            resources[id(endpoint)] = (client, asyncio.Semaphore(endpoint.concurrency_limit))
+            # Let the closer start: a task cancelled before its first step
+            # never runs its finally block
+            await asyncio.sleep(0)
+        return resources[id(endpoint)]
+    
+    def _create_async_client(self, endpoint: Endpoint):
+        """Returns (async client, coroutine function closing it) for an endpoint."""
+        import httpx
+        limits = httpx.Limits(
+            max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=self.KEEPALIVE_EXPIRY,
+        )
+        if endpoint.provider == "anthropic":
+            import anthropic
+            client = anthropic.AsyncAnthropic(
+                api_key=endpoint.api_key,
+                http_client=anthropic.DefaultAsyncHttpxClient(limits=limits, timeout=self.HTTP_TIMEOUT),
+            )
+            return client, client.close
+        
+        # google-genai keeps one async transport per Client, so give each loop
+        # its own Client on a fresh one (sharing the pooled sync transport)
+        from google import genai
+        from google.genai import types
+        http = httpx.AsyncClient(limits=limits, timeout=self.HTTP_TIMEOUT)
+        client = genai.Client(
+            api_key=endpoint.api_key,
+            http_options=types.HttpOptions(httpx_client=endpoint.http, httpx_async_client=http),
+        )
+        return client.aio, http.aclose
+    
+    def _close_async(self):
+        """
+        Close the async clients on the loop that owns them.
+        
+        After asyncio.run() they are already closed. A loop that is running
+        (here or in another thread) runs the closers on its next iteration.
+        A loop that is open but idle is run until the closers finish, from a
+        helper thread, since this thread may be running a different loop.
+        """
+        if self._async is None:
+            return
+        loop, _, closers = self._async
+        self._async = None
+        closers = [c for c in closers if not c.done()]
+        if not closers or loop.is_closed():
+            return
+        if loop.is_running():
+            for closer in closers:
+                loop.call_soon_threadsafe(closer.cancel)
+            return
+        for closer in closers:
+            closer.cancel()
+        finished = asyncio.gather(*closers, return_exceptions=True)
+        worker = threading.Thread(target=loop.run_until_complete, args=(finished,))
+        worker.start()
+        worker.join()
+    
+    @staticmethod
+    async def _close_when_cancelled(aclose):
+        """Wait until cancelled (loop shutdown or close()), then run aclose()."""
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await aclose()
     
-    def _call_anthropic(self, prompt: str) -> str:
-        """Call Anthropic Claude API."""
-        message = self.client.messages.create(
-            model=self.model,
-            max_tokens=100,
+    def _call_anthropic(self, prompt: str, endpoint: Endpoint = None) -> str:
+        """Call Anthropic Claude API, dropping the stream once the number is read."""
+        endpoint = endpoint or self.endpoints[0]
+        text = ""
+        request = self._anthropic_request(prompt, endpoint=endpoint)
+        with endpoint.client.messages.stream(**request) as stream:
+            for delta in stream.text_stream:
+                text += delta
+                answer = complete_answer(text)
+                if answer is not None:
+                    return answer
+        return text
+    
+    def _call_gemini(self, prompt: str, endpoint: Endpoint = None) -> str:
+        """Call Google Gemini API, dropping the stream once the number is read."""
+        endpoint = endpoint or self.endpoints[0]
+        text = ""
+        request = self._gemini_request(prompt, endpoint=endpoint)
+        stream = endpoint.client.models.generate_content_stream(**request)
+        try:
+            for chunk in stream:
+                text += chunk.text or ""
+                answer = complete_answer(text)
+                if answer is not None:
+                    return answer
+        finally:
+            stream.close()
+        return _require_text(text)
+    
+    def _anthropic_request(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        endpoint: Endpoint = None,
+    ) -> Dict[str, Any]:
+        """Arguments for an Anthropic messages.create call.
+        
+        The system prompt is marked cacheable, so repeat calls only pay
+        for the per-turn prompt once it is long enough to be cached.
+        """
+        return dict(
+            model=endpoint.model if endpoint else self.model,
+            max_tokens=max_tokens or self.MAX_ANSWER_TOKENS,
             temperature=self.temperature,
-            system="You are playing a real-time strategy game. Choose actions by responding with ONLY a number.",
+            system=[{"type": "text", "text": self.system_prompt, "cache_control": {"type": "ephemeral"}}],
             messages=[{"role": "user", "content": prompt}]
         )
-        return message.content[0].text
     
-    def _call_gemini(self, prompt: str) -> str:
-        """Call Google Gemini API."""
+    def _gemini_request(
+        self,
+        prompt: str,
+        max_tokens: int = None,
+        stop_at_newline: bool = True,
+        endpoint: Endpoint = None,
+    ) -> Dict[str, Any]:
+        """Arguments for a Gemini generate_content call.
+        
+        Thinking is kept minimal and the output budget padded by
+        GEMINI_THINKING_TOKENS, so the answer isn't crowded out by thinking.
+        The system prompt comes from the endpoint's context cache if it has one.
+        """
         from google.genai import types
         
-        response = self.client.models.generate_content(
-            model=self.model,
+        endpoint = endpoint or (self.endpoints[0] if self.endpoints else None)
+        prefix_cache = endpoint.prefix_cache if endpoint else None
+        return dict(
+            model=endpoint.model if endpoint else self.model,
             contents=prompt,
             config=types.GenerateContentConfig(
-                system_instruction="You are playing a real-time strategy game. Choose actions by responding with ONLY a number.",
+                system_instruction=None if prefix_cache else self.system_prompt,
+                cached_content=prefix_cache,
                 temperature=self.temperature,
-                max_output_tokens=50,
+                max_output_tokens=(max_tokens or self.MAX_ANSWER_TOKENS) + self.GEMINI_THINKING_TOKENS,
+                stop_sequences=["\n"] if stop_at_newline else None,
+                thinking_config=types.ThinkingConfig(thinking_level=types.ThinkingLevel.MINIMAL),
             )
         )
-        return response.text
     
     def _get_default_action(self, action_space) -> int:
         """Get a safe default action."""
@@ -221,12 +926,11 @@ class ClaudePolicy:
     
     def update_reward(self, reward: float):
         """Update the last turn's reward."""
-        if self.history:
-            self.history[-1].reward = reward
+        self.history.set_last_reward(reward)
     
     def reset(self):
         """Reset for new episode."""
-        self.history = []
+        self.history.clear()
         self.turn_count = 0
         logger.info("Policy reset for new episode")
     
@@ -235,11 +939,7 @@ class ClaudePolicy:
         if not self.history:
             return "No actions taken"
         
-        total_reward = sum(h.reward for h in self.history)
-        action_counts = {}
-        for h in self.history:
-            action_counts[h.action] = action_counts.get(h.action, 0) + 1
-        
-        most_common = max(action_counts.items(), key=lambda x: x[1])
+        total_reward = self.history.total_reward()
+        most_common = self.history.most_common_action()
         
         return f"Turns: {len(self.history)}, Total Reward: {total_reward:.1f}, Most Used Action: {most_common[0]} ({most_common[1]} times)"
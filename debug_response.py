@@ -1,17 +1,62 @@
 #!/usr/bin/env python3
 """Debug script to see raw 0 AD RL interface response."""
+import shutil
+import sys
+from pathlib import Path
+
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# orjson parses and re-indents large entity dumps several times faster;
+# fall back to stdlib json when it isn't installed
+try:
+    import orjson
+    
+    json_loads = orjson.loads
+    
+    def json_dumps_indented(data) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+except ImportError:
+    json_loads = json.loads
+    
+    def json_dumps_indented(data) -> bytes:
+        return json.dumps(data, indent=2).encode()
 
 BASE_URL = "http://127.0.0.1:6000"
+OUTPUT_PATH = "debug_response.json"
+
+# Reused connection for every request to the RL interface. Only connection
+# failures are retried: urllib3 never replays a POST /step that reached the
+# game, which would advance the simulation
+session = requests.Session()
+session.mount("http://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.3),
+))
+
+# --save-only: just dump the response, skip parsing and the summary
+save_only = "--save-only" in sys.argv[1:]
 
 print("🔍 Sending step request to 0 AD...")
 
 try:
-    response = requests.post(f"{BASE_URL}/step", data="", timeout=10)
-    data = response.json()
+    # Stream the body straight to disk instead of holding it in memory
+    with session.post(f"{BASE_URL}/step", data="", timeout=10, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with open(OUTPUT_PATH, "wb") as f:
+            shutil.copyfileobj(response.raw, f)
     
     print(f"\n✓ Got response!")
+    print(f"\n💾 Full response saved to {OUTPUT_PATH}")
+    if save_only:
+        sys.exit(0)
+    
+    output = Path(OUTPUT_PATH)
+    data = json_loads(output.read_bytes())
     print(f"\n📋 Top-level keys: {list(data.keys())}")
     
     # Check entities type
@@ -54,10 +99,8 @@ try:
                 for k, v in list(p.items())[:15]:
                     print(f"    {k}: {str(v)[:80]}")
     
-    # Save full response
-    with open("debug_response.json", "w") as f:
-        json.dump(data, f, indent=2)
-    print("\n💾 Full response saved to debug_response.json")
+    # Re-save indented for reading
+    output.write_bytes(json_dumps_indented(data))
     
 except Exception as e:
     import traceback
@@ -8,16 +8,17 @@ Instead of fixed 10 actions, generates relevant actions based on:
 - Economy state (idle workers, resource needs)
 """
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import random
+from typing import List, Dict, Any, Optional, Tuple, Union
 from dataclasses import dataclass
 
-from zero_ad_client import GameState, Commands
+from zero_ad_client import GameState, Commands, FLAG_WORKER, FLAG_MILITARY, FLAG_IDLE
 from game_knowledge import get_unit_template, CIV_UNITS
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class DynamicAction:
     """A dynamically generated action."""
     id: int
@@ -53,6 +54,15 @@ class DynamicActionGenerator:
     def __init__(self, civ: str = "mace"):
         self.civ = civ
         self.action_counter = 0
+        
+        # Templates are fixed once the civ is known
+        self._female_template = get_unit_template(civ, "female_citizen")
+        self._infantry_template = get_unit_template(civ, "infantry_spearman")
+        self._cavalry_template = get_unit_template(civ, "cavalry")
+        self._building_templates = {
+            building: f"structures/{civ}/{building}"
+            for building in ("house", "barracks", "farmstead", "storehouse")
+        }
     
     def generate_actions(self, state: GameState) -> List[DynamicAction]:
         """Generate all available actions for current state."""
@@ -90,6 +100,11 @@ class DynamicActionGenerator:
         self.action_counter += 1
         return self.action_counter - 1
     
+    def _base_building(self, state: GameState) -> Dict:
+        """Our civic centre, or any building if it is gone. Requires my_buildings."""
+        civic = state.buildings_by_type().get("civic_centre")
+        return civic[0] if civic else state.my_buildings[0]
+    
     def _can_afford(self, state: GameState, item: str) -> bool:
         """Check if we can afford an item."""
         costs = self.COSTS.get(item, {})
@@ -103,10 +118,9 @@ class DynamicActionGenerator:
         actions = []
         
         # Find idle workers
-        workers = [u for u in state.my_units if "female" in u["name"].lower() or "citizen" in u["name"].lower()]
-        idle_workers = [u for u in workers if u.get("idle", False)]
+        idle_ids = state.units_soa().ids_where(FLAG_WORKER | FLAG_IDLE)
         
-        if idle_workers:
+        if idle_ids:
             # High priority: put idle workers to work
             for resource in ["food", "wood", "stone", "metal"]:
                 priority = 8 if resource == "food" else 6
@@ -118,10 +132,10 @@ class DynamicActionGenerator:
                 actions.append(DynamicAction(
                     id=self._next_id(),
                     name=f"Gather {resource.title()}",
-                    description=f"Send {len(idle_workers)} idle workers to gather {resource}",
+                    description=f"Send {len(idle_ids)} idle workers to gather {resource}",
                     category="economy",
                     priority=priority,
-                    command_generator=lambda s, r=resource, w=idle_workers: self._gather_command(s, w, r)
+                    command_generator=lambda s, r=resource, w=idle_ids: self._gather_command(s, w, r)
                 ))
         
         return actions
@@ -130,66 +144,65 @@ class DynamicActionGenerator:
         """Generate unit training actions based on available buildings."""
         actions = []
         
-        for building in state.my_buildings:
-            name = building["name"].lower()
-            
-            # Civic center - train workers
-            if "civil" in name or "centre" in name or "center" in name:
-                if self._can_afford(state, "female_citizen"):
-                    # Higher priority if few workers
-                    workers = len([u for u in state.my_units if "female" in u["name"].lower()])
-                    priority = 7 if workers < 10 else 4
-                    
-                    actions.append(DynamicAction(
-                        id=self._next_id(),
-                        name="Train Worker",
-                        description="Train a female citizen from civic center",
-                        category="economy",
-                        priority=priority,
-                        requirements=self.COSTS["female_citizen"],
-                        command_generator=lambda s, b=building: [Commands.train(
-                            b["id"], get_unit_template(self.civ, "female_citizen")
-                        )]
-                    ))
-            
-            # Barracks - train infantry
-            elif "barracks" in name:
-                if self._can_afford(state, "infantry_spearman"):
-                    actions.append(DynamicAction(
-                        id=self._next_id(),
-                        name="Train Spearman",
-                        description="Train infantry spearman from barracks",
-                        category="military",
-                        priority=5,
-                        requirements=self.COSTS["infantry_spearman"],
-                        command_generator=lambda s, b=building: [Commands.train(
-                            b["id"], get_unit_template(self.civ, "infantry_spearman")
-                        )]
-                    ))
-            
-            # Stable - train cavalry
-            elif "stable" in name:
-                if self._can_afford(state, "cavalry"):
-                    actions.append(DynamicAction(
-                        id=self._next_id(),
-                        name="Train Cavalry",
-                        description="Train cavalry unit from stable",
-                        category="military",
-                        priority=5,
-                        requirements=self.COSTS["cavalry"],
-                        command_generator=lambda s, b=building: [Commands.train(
-                            b["id"], get_unit_template(self.civ, "cavalry")
-                        )]
-                    ))
+        index = state.buildings_by_type()
+        
+        # Civic center - train workers
+        for building in index.get("civic_centre", []):
+            if self._can_afford(state, "female_citizen"):
+                # Higher priority if few workers
+                n_workers, _, _ = state.unit_counts()
+                priority = 7 if n_workers < 10 else 4
+                
+                actions.append(DynamicAction(
+                    id=self._next_id(),
+                    name="Train Worker",
+                    description="Train a female citizen from civic center",
+                    category="economy",
+                    priority=priority,
+                    requirements=self.COSTS["female_citizen"],
+                    command_generator=lambda s, b=building: [Commands.train(
+                        b["id"], self._female_template
+                    )]
+                ))
+        
+        # Barracks - train infantry
+        for building in index.get("barracks", []):
+            if self._can_afford(state, "infantry_spearman"):
+                actions.append(DynamicAction(
+                    id=self._next_id(),
+                    name="Train Spearman",
+                    description="Train infantry spearman from barracks",
+                    category="military",
+                    priority=5,
+                    requirements=self.COSTS["infantry_spearman"],
+                    command_generator=lambda s, b=building: [Commands.train(
+                        b["id"], self._infantry_template
+                    )]
+                ))
+        
+        # Stable - train cavalry
+        for building in index.get("stable", []):
+            if self._can_afford(state, "cavalry"):
+                actions.append(DynamicAction(
+                    id=self._next_id(),
+                    name="Train Cavalry",
+                    description="Train cavalry unit from stable",
+                    category="military",
+                    priority=5,
+                    requirements=self.COSTS["cavalry"],
+                    command_generator=lambda s, b=building: [Commands.train(
+                        b["id"], self._cavalry_template
+                    )]
+                ))
         
         return actions
     
     def _generate_building_actions(self, state: GameState) -> List[DynamicAction]:
         """Generate building construction actions."""
         actions = []
-        workers = [u for u in state.my_units if "female" in u["name"].lower()]
+        worker_ids = state.units_soa().ids_where(FLAG_WORKER)
         
-        if not workers:
+        if not worker_ids:
             return actions
         
         # Build house if near pop cap
@@ -202,11 +215,11 @@ class DynamicActionGenerator:
                     category="build",
                     priority=9,  # High priority when pop capped
                     requirements=self.COSTS["house"],
-                    command_generator=lambda s, w=workers: self._build_command(s, w[0], "house")
+                    command_generator=lambda s, w=worker_ids[0]: self._build_command(s, w, "house")
                 ))
         
         # Build barracks if none
-        has_barracks = any("barracks" in b["name"].lower() for b in state.my_buildings)
+        has_barracks = bool(state.buildings_by_type().get("barracks"))
         if not has_barracks and self._can_afford(state, "barracks"):
             actions.append(DynamicAction(
                 id=self._next_id(),
@@ -215,7 +228,7 @@ class DynamicActionGenerator:
                 category="build",
                 priority=6,
                 requirements=self.COSTS["barracks"],
-                command_generator=lambda s, w=workers: self._build_command(s, w[0], "barracks")
+                command_generator=lambda s, w=worker_ids[0]: self._build_command(s, w, "barracks")
             ))
         
         return actions
@@ -224,9 +237,10 @@ class DynamicActionGenerator:
         """Generate military actions."""
         actions = []
         
-        military = [u for u in state.my_units if "female" not in u["name"].lower() and "citizen" not in u["name"].lower()]
+        units = state.units_soa()
+        military_ids = units.ids_where(FLAG_MILITARY)
         
-        if not military:
+        if not military_ids:
             return actions
         
         # Attack if enemies visible
@@ -236,55 +250,54 @@ class DynamicActionGenerator:
             actions.append(DynamicAction(
                 id=self._next_id(),
                 name="Attack Enemy",
-                description=f"Attack nearest enemy with {len(military)} military units",
+                description=f"Attack nearest enemy with {len(military_ids)} military units",
                 category="military",
                 priority=5,
-                command_generator=lambda s, m=military, e=closest_enemy: [
-                    Commands.attack([u["id"] for u in m], e["id"])
+                command_generator=lambda s, m=military_ids, e=closest_enemy: [
+                    Commands.attack(m, e["id"])
                 ]
             ))
             
             # All-out attack
-            all_units = state.my_units
+            all_ids = units.ids.tolist()
             actions.append(DynamicAction(
                 id=self._next_id(),
                 name="All-Out Attack",
-                description=f"Attack with ALL {len(all_units)} units (risky!)",
+                description=f"Attack with ALL {len(all_ids)} units (risky!)",
                 category="military",
                 priority=3,
-                command_generator=lambda s, a=all_units, e=closest_enemy: [
-                    Commands.attack([u["id"] for u in a], e["id"])
+                command_generator=lambda s, a=all_ids, e=closest_enemy: [
+                    Commands.attack(a, e["id"])
                 ]
             ))
         
         # Defend base
         if state.my_buildings:
-            civic = next((b for b in state.my_buildings if "civil" in b["name"].lower()), state.my_buildings[0])
+            civic = self._base_building(state)
             pos = civic["position"]
             
             actions.append(DynamicAction(
                 id=self._next_id(),
                 name="Defend Base",
-                description=f"Move {len(military)} military units to defend base",
+                description=f"Move {len(military_ids)} military units to defend base",
                 category="defense",
                 priority=4,
-                command_generator=lambda s, m=military, p=pos: [
-                    Commands.move([u["id"] for u in m], p.get("x", 0), p.get("z", 0))
+                command_generator=lambda s, m=military_ids, p=pos: [
+                    Commands.move(m, p["x"], p["z"])
                 ]
             ))
         
         return actions
     
-    def _gather_command(self, state: GameState, workers: List[Dict], resource: str) -> List[Dict]:
+    def _gather_command(self, state: GameState, worker_ids: List[int], resource: str) -> List[Dict]:
         """Generate gather commands (simplified - moves workers in a direction)."""
         # In a full implementation, we'd find actual resource entities
         # For now, just move workers to approximate locations
-        if not workers or not state.my_buildings:
+        if not worker_ids or not state.my_buildings:
             return []
         
-        civic = next((b for b in state.my_buildings if "civil" in b["name"].lower()), state.my_buildings[0])
-        base_x = civic["position"].get("x", 0)
-        base_z = civic["position"].get("z", 0)
+        pos = self._base_building(state)["position"]
+        base_x, base_z = pos["x"], pos["z"]
         
         # Direction offsets for different resources
         offsets = {
@@ -298,25 +311,23 @@ class DynamicActionGenerator:
         target_x = base_x + offset[0]
         target_z = base_z + offset[1]
         
-        return [Commands.move([w["id"] for w in workers], target_x, target_z)]
+        return [Commands.move(worker_ids, target_x, target_z)]
     
-    def _build_command(self, state: GameState, worker: Dict, building_type: str) -> List[Dict]:
+    def _build_command(self, state: GameState, worker_id: int, building_type: str) -> List[Dict]:
         """Generate build command."""
         if not state.my_buildings:
             return []
         
-        civic = next((b for b in state.my_buildings if "civil" in b["name"].lower()), state.my_buildings[0])
-        base_x = civic["position"].get("x", 0)
-        base_z = civic["position"].get("z", 0)
+        pos = self._base_building(state)["position"]
+        base_x, base_z = pos["x"], pos["z"]
         
         # Offset for new building
-        import random
         offset_x = random.randint(-30, 30)
         offset_z = random.randint(-30, 30)
         
-        template = f"structures/{self.civ}/{building_type}"
+        template = self._building_templates.get(building_type) or f"structures/{self.civ}/{building_type}"
         
-        return [Commands.build([worker["id"]], template, base_x + offset_x, base_z + offset_z)]
+        return [Commands.build([worker_id], template, base_x + offset_x, base_z + offset_z)]
     
     def format_actions_for_prompt(self, actions: List[DynamicAction]) -> str:
         """Format actions as numbered list for LLM prompt."""
@@ -332,13 +343,27 @@ class DynamicActionGenerator:
         
         return "\n".join(lines)
     
-    def execute_action(self, action_id: int, actions: List[DynamicAction], state: GameState) -> List[Dict]:
-        """Execute an action by ID and return commands."""
-        for action in actions:
-            if action.id == action_id:
-                commands = action.command_generator(state)
-                logger.info(f"Executing: {action.name} → {len(commands)} command(s)")
-                return commands
+    @staticmethod
+    def index_actions(actions: List[DynamicAction]) -> Dict[int, DynamicAction]:
+        """Map action IDs to actions, for constant-time dispatch."""
+        return {action.id: action for action in actions}
+    
+    def execute_action(
+        self,
+        action_id: int,
+        actions: Union[List[DynamicAction], Dict[int, DynamicAction]],
+        state: GameState,
+    ) -> List[Dict]:
+        """Execute an action by ID and return commands.
+        
+        actions may be the generated list or an index from index_actions().
+        """
+        by_id = actions if isinstance(actions, dict) else self.index_actions(actions)
+        action = by_id.get(action_id)
+        if action is None:
+            logger.warning("Action ID %s not found", action_id)
+            return []
         
-        logger.warning(f"Action ID {action_id} not found")
-        return []
+        commands = action.command_generator(state)
+        logger.info("Executing: %s → %d command(s)", action.name, len(commands))
+        return commands
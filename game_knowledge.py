@@ -7,6 +7,7 @@ This module contains:
 - Strategy guidelines
 - System prompts for the LLM
 """
+from functools import lru_cache
 
 # Civilization unit templates
 CIV_UNITS = {
@@ -55,14 +56,63 @@ BUILDINGS = {
 }
 
 
+# Unit kinds: small integer codes so classification is an int compare
+# instead of substring matching on names
+KIND_WORKER = 0
+KIND_INFANTRY = 1
+KIND_CAVALRY = 2
+KIND_OTHER = 3  # any other unit (champions, siege, ships, ...)
+
+
+def _kind_of_unit_type(unit_type: str) -> int:
+    """Kind for a unit type key or template name."""
+    if "female" in unit_type or "citizen" in unit_type:
+        return KIND_WORKER
+    if "cavalry" in unit_type:
+        return KIND_CAVALRY
+    if "infantry" in unit_type:
+        return KIND_INFANTRY
+    return KIND_OTHER
+
+
+# Template → kind, for every template we know about
+KIND_TABLE = {
+    template: _kind_of_unit_type(unit_type)
+    for units in CIV_UNITS.values()
+    for unit_type, template in units.items()
+}
+
+
+@lru_cache(maxsize=1024)
+def unit_kind(template: str) -> int:
+    """Get the kind of a unit template (KIND_* constant)."""
+    kind = KIND_TABLE.get(template)
+    if kind is None:
+        kind = _kind_of_unit_type(template.rpartition("/")[2].lower())
+    return kind
+
+
+# (civ, unit type) → template, flattened from CIV_UNITS
+_UNIT_TEMPLATES = {
+    (civ, unit_type): template
+    for civ, units in CIV_UNITS.items()
+    for unit_type, template in units.items()
+}
+
+
+# Unbounded: the (civ, unit type) space is tiny and the unbounded cache skips
+# LRU bookkeeping on every hit
+@lru_cache(maxsize=None)
 def get_unit_template(civ: str, unit_type: str) -> str:
     """Get unit template for a civilization."""
     civ = civ.lower()
     if civ not in CIV_UNITS:
         civ = "default"
     
-    units = CIV_UNITS[civ]
-    return units.get(unit_type, units.get("female_citizen", ""))
+    template = _UNIT_TEMPLATES.get((civ, unit_type))
+    if template is None:
+        template = _UNIT_TEMPLATES.get((civ, "female_citizen"), "")
+    return template
 
 
 # System prompt for the LLM
@@ -94,33 +144,3 @@ You will choose from numbered actions. Pick the action number that best matches
 Reply with ONLY a single number (0-9). No explanation needed.
 Example: 4
 """
-
-
-# Action descriptions for the LLM prompt
-ACTION_DESCRIPTIONS = [
-    "0: Train a worker from civic center (costs food)",
-    "1: Train infantry from barracks (costs food + wood)", 
-    "2: Attack nearest enemy with military units",
-    "3: Send workers to gather food",
-    "4: Attack with ALL units (aggressive)",
-    "5: Defend - move military to base",
-    "6: Train cavalry (if available)",
-    "7: Build a house (increases pop limit)",
-    "8: Retreat all units to civic center",
-    "9: Do nothing (wait)",
-]
-
-
-def build_strategy_prompt(state_summary: str, civ: str = "mace") -> str:
-    """Build the full prompt for the LLM."""
-    return f"""{GAME_KNOWLEDGE_PROMPT}
-
-## Current Civilization: {civ.upper()}
-
-## Current Game State:
-{state_summary}
-
-## Available Actions:
-{chr(10).join(ACTION_DESCRIPTIONS)}
-
-What action do you choose? Reply with ONLY the number:"""
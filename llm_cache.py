@@ -0,0 +1,171 @@
+"""
+LLM Cache - Memoizes LLM responses keyed on a hash of the prompt.
+
+Many turns produce the exact same prompt (nothing changed since last turn),
+so serving those from a cache skips the API round-trip entirely.
+
+Backends:
+- In-memory LRU (always on)
+- Optional SQLite file so the cache survives restarts
+
+SimilarityCache is a second level for near-duplicate states: it matches
+feature vectors by cosine similarity instead of exact keys.
+"""
+import hashlib
+import logging
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Bounded LRU cache of LLM responses.
+    
+    Keys are blake2b digests of the prompt (plus anything else that affects
+    the response, e.g. provider and model). When a path is given, entries are
+    also written through to a SQLite table and read back on a memory miss.
+    """
+    
+    def __init__(self, maxsize: int = 4096, path: str = None):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._db = None
+        
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            self._db.commit()
+            logger.info(f"Using persistent LLM cache: {path}")
+    
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Build a cache key from the parts that determine a response."""
+        return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss."""
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+        
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT value FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                self._remember(key, row[0])
+                self.hits += 1
+                return row[0]
+        
+        self.misses += 1
+        return None
+    
+    def set(self, key: str, value: str):
+        """Store a response."""
+        self._remember(key, value)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value) VALUES (?, ?)", (key, value)
+            )
+            self._db.commit()
+    
+    def _remember(self, key: str, value: str):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def clear(self):
+        """Drop all in-memory and persisted entries."""
+        self._entries.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM llm_cache")
+            self._db.commit()
+    
+    def close(self):
+        """Close the SQLite backend, if any."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class SimilarityCache:
+    """
+    Bounded cache of values keyed by feature vectors.
+    
+    A lookup returns the value stored for the most similar vector if its
+    cosine similarity is at least `threshold`. Vectors live in one
+    preallocated matrix, so a lookup is a single matrix-vector product;
+    when full, the least recently used row is overwritten.
+    """
+    
+    def __init__(self, threshold: float = 0.95, maxsize: int = 1024):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._vecs: Optional[np.ndarray] = None  # (maxsize, d), unit rows
+        self._last_used = np.zeros(maxsize, dtype=np.int64)
+        self._values: List[Any] = []
+        self._clock = 0
+    
+    @staticmethod
+    def _normalize(vec) -> Optional[np.ndarray]:
+        vec = np.asarray(vec, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else None
+    
+    def get(self, vec) -> Optional[Any]:
+        """Value for the closest stored vector, or None if none is close enough."""
+        q = self._normalize(vec)
+        n = len(self._values)
+        if q is not None and n:
+            sims = self._vecs[:n] @ q
+            i = int(np.argmax(sims))
+            if sims[i] >= self.threshold:
+                self._clock += 1
+                self._last_used[i] = self._clock
+                self.hits += 1
+                return self._values[i]
+        
+        self.misses += 1
+        return None
+    
+    def set(self, vec, value: Any):
+        """Store a value for a vector, evicting the least recently used if full."""
+        q = self._normalize(vec)
+        if q is None:
+            return
+        if self._vecs is None:
+            self._vecs = np.zeros((self.maxsize, len(q)), dtype=np.float32)
+        
+        n = len(self._values)
+        if n < self.maxsize:
+            i = n
+            self._values.append(value)
+        else:
+            i = int(np.argmin(self._last_used))
+            self._values[i] = value
+        
+        self._clock += 1
+        self._vecs[i] = q
+        self._last_used[i] = self._clock
+    
+    def __len__(self) -> int:
+        return len(self._values)
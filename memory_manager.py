@@ -9,16 +9,32 @@ The AI can learn from gameplay and persist knowledge across sessions.
 import os
 import json
 import time
-from datetime import datetime
+import weakref
+from collections import deque
+from itertools import islice
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Deque
 from dataclasses import dataclass, field, asdict
 import logging
 
 logger = logging.getLogger(__name__)
 
+# (time.time() at which it goes stale, today's date as YYYY-MM-DD)
+_today_cache = (0.0, "")
 
-@dataclass
+
+def _today() -> str:
+    """Today's local date as YYYY-MM-DD, formatted once per day."""
+    global _today_cache
+    if time.time() >= _today_cache[0]:
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        _today_cache = (midnight.timestamp(), now.strftime("%Y-%m-%d"))
+    return _today_cache[1]
+
+
+@dataclass(slots=True)
 class TurnEvent:
     """Record of a single turn."""
     turn: int
@@ -29,14 +45,26 @@ class TurnEvent:
     my_units: int
     my_buildings: int
     enemy_units: int
-    resources: Dict[str, int]
+    resources: Tuple[int, int, int, int]  # food, wood, stone, metal
     outcome: str = ""  # e.g., "trained worker", "attack failed"
     reward: float = 0.0
+    total_resources: int = field(init=False, default=0)
+    
+    def __post_init__(self):
+        food, wood, stone, metal = self.resources
+        self.total_resources = food + wood + stone + metal
 
 
-@dataclass
+@dataclass(slots=True)
 class GameStats:
-    """Aggregate statistics for a game session."""
+    """
+    Aggregate statistics for a game session.
+    
+    Updated incrementally by MemoryManager.record_turn(), so the stats are a
+    complete summary of the game's turns: end-of-game analysis reads them
+    instead of rescanning short-term memory (which only holds the last few
+    turns anyway).
+    """
     total_turns: int = 0
     total_reward: float = 0.0
     units_trained: int = 0
@@ -56,6 +84,14 @@ class MemoryManager:
     Long-term: Markdown files with learned knowledge
     """
     
+    # Action id → GameStats counter it increments
+    ACTION_STATS = {
+        0: "units_trained",
+        7: "buildings_built",
+        2: "attacks_launched",
+        4: "attacks_launched",
+    }
+    
     def __init__(
         self,
         memory_dir: str = "./memory/",
@@ -65,13 +101,22 @@ class MemoryManager:
         self.memory_dir.mkdir(parents=True, exist_ok=True)
         
         self.short_term_size = short_term_size
-        self.short_term: List[TurnEvent] = []
+        self.short_term: Deque[TurnEvent] = deque(maxlen=short_term_size)
         self.game_stats = GameStats()
         
         # Current strategic goal
         self.current_strategy = "economy"  # economy, military, defense, expansion
         self.strategic_goals: List[str] = []
         
+        # Knowledge file contents by path, as (st_mtime_ns, st_size, text)
+        self._lt_cache: Dict[str, Tuple[int, int, str]] = {}
+        # Summary from get_long_term_knowledge(), with the contents it was built from
+        self._summary_cache: Tuple[Tuple[Optional[str], ...], str] = ((), "")
+        
+        # game_history.jsonl, opened on the first save_game_summary()
+        self._history_path = os.path.join(self.memory_dir, "game_history.jsonl")
+        self._history_file = None
+        
         # Load long-term memory
         self._load_long_term_memory()
     
@@ -84,35 +129,55 @@ class MemoryManager:
         self.game_stats.total_reward += event.reward
         self.game_stats.peak_units = max(self.game_stats.peak_units, event.my_units)
         
-        total_res = sum(event.resources.values())
-        self.game_stats.peak_resources = max(self.game_stats.peak_resources, total_res)
+        self.game_stats.peak_resources = max(self.game_stats.peak_resources, event.total_resources)
         
         # Track action types
-        if event.action == 0:
-            self.game_stats.units_trained += 1
-        elif event.action == 7:
-            self.game_stats.buildings_built += 1
-        elif event.action in [2, 4]:
-            self.game_stats.attacks_launched += 1
-        
-        # Trim short-term memory
-        if len(self.short_term) > self.short_term_size * 2:
-            self.short_term = self.short_term[-self.short_term_size:]
+        stat = self.ACTION_STATS.get(event.action)
+        if stat is not None:
+            setattr(self.game_stats, stat, getattr(self.game_stats, stat) + 1)
     
     def get_recent_turns(self, n: int = 5) -> List[TurnEvent]:
         """Get the last N turns from short-term memory."""
-        return self.short_term[-n:]
+        return list(islice(self.short_term, max(0, len(self.short_term) - n), None))
     
-    def get_short_term_summary(self) -> str:
-        """Summarize recent events for the AI prompt."""
+    def get_short_term_summary(self, verbatim: int = 3, window: int = 15) -> str:
+        """
+        Summarize recent events for the AI prompt.
+        
+        The last `verbatim` turns are listed individually (repeats of the same
+        action are collapsed into one line); the turns before them, up to
+        `window` back, are condensed into a single action tally so the prompt
+        stays the same size however long the game runs.
+        """
         if not self.short_term:
             return "No recent history."
         
-        recent = self.short_term[-5:]
+        recent = self.get_recent_turns(window)
+        older, latest = recent[:-verbatim], recent[-verbatim:]
         lines = ["Recent turns:"]
         
-        for event in recent:
-            lines.append(f"  Turn {event.turn}: {event.action_description} → {event.outcome or 'ok'}")
+        if older:
+            tally: Dict[str, int] = {}
+            for event in older:
+                tally[event.action_description] = tally.get(event.action_description, 0) + 1
+            counts = ", ".join(f"{name} x{n}" for name, n in tally.items())
+            lines.append(f"  Earlier (turns {older[0].turn}-{older[-1].turn}): {counts}")
+        
+        start = 0
+        while start < len(latest):
+            event = latest[start]
+            outcome = event.outcome or 'ok'
+            end = start
+            while (end + 1 < len(latest)
+                   and latest[end + 1].action_description == event.action_description
+                   and (latest[end + 1].outcome or 'ok') == outcome):
+                end += 1
+            
+            if end > start:
+                lines.append(f"  Turns {event.turn}-{latest[end].turn}: {event.action_description} → {outcome} (x{end - start + 1})")
+            else:
+                lines.append(f"  Turn {event.turn}: {event.action_description} → {outcome}")
+            start = end + 1
         
         return "\n".join(lines)
     
@@ -120,7 +185,7 @@ class MemoryManager:
         """Set the current strategic focus."""
         self.current_strategy = strategy.lower()
         self.strategic_goals = goals or []
-        logger.info(f"Strategy set to: {strategy}")
+        logger.info("Strategy set to: %s", strategy)
     
     def get_strategy_context(self) -> str:
         """Get current strategy for the prompt."""
@@ -138,6 +203,8 @@ class MemoryManager:
             "strategies": self.memory_dir / "strategies.md",
             "patterns": self.memory_dir / "patterns.md",
         }
+        # Plain string paths for the per-turn reads, skipping pathlib
+        self._knowledge_paths = {cat: os.fspath(path) for cat, path in self.knowledge_files.items()}
         
         # Create default files if they don't exist
         self._init_knowledge_files()
@@ -191,47 +258,86 @@ class MemoryManager:
 """
         }
         
+        # One directory scan instead of a stat per file
+        with os.scandir(self.memory_dir) as entries:
+            existing = {entry.name for entry in entries}
+        
         for key, path in self.knowledge_files.items():
-            if not path.exists():
-                path.write_text(defaults[key])
+            if path.name not in existing:
+                try:
+                    # Exclusive create: another game may have just made it
+                    with open(path, "x", encoding="utf-8") as f:
+                        f.write(defaults[key])
+                except FileExistsError:
+                    continue
                 logger.info(f"Created knowledge file: {path}")
     
     def get_long_term_knowledge(self, category: str = None) -> str:
         """Get knowledge from long-term memory files."""
         if category and category in self.knowledge_files:
-            path = self.knowledge_files[category]
-            if path.exists():
-                return path.read_text()
+            content = self._read_cached(self._knowledge_paths[category])
+            if content is not None:
+                return content
+        
+        # Return summary of all knowledge, rebuilt only when a file changed
+        contents = tuple(self._read_cached(path) for path in self._knowledge_paths.values())
+        built_from, summary = self._summary_cache
+        if len(built_from) == len(contents) and all(a is b for a, b in zip(built_from, contents)):
+            return summary
         
-        # Return summary of all knowledge
         all_knowledge = []
-        for cat, path in self.knowledge_files.items():
-            if path.exists():
-                content = path.read_text()
+        for cat, content in zip(self.knowledge_files, contents):
+            if content is not None:
                 # Get first 20 lines as summary
-                lines = content.split("\n")[:20]
+                lines = content.split("\n", 20)[:20]
                 all_knowledge.append(f"## {cat.title()}\n" + "\n".join(lines))
         
-        return "\n\n".join(all_knowledge)
+        summary = "\n\n".join(all_knowledge)
+        self._summary_cache = (contents, summary)
+        return summary
+    
+    def _read_cached(self, path: str) -> Optional[str]:
+        """
+        Contents of a knowledge file, or None if it doesn't exist.
+        
+        Files are only re-read when their mtime or size changes, so the
+        per-turn cost is a single stat.
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._lt_cache.pop(path, None)
+            return None
+        
+        cached = self._lt_cache.get(path)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+        self._lt_cache[path] = (st.st_mtime_ns, st.st_size, content)
+        return content
     
     def add_learned_tip(self, tip: str, category: str = "tips"):
         """Add a new tip to long-term memory."""
         if category not in self.knowledge_files:
             return
         
-        path = self.knowledge_files[category]
-        current = path.read_text() if path.exists() else ""
-        
-        # Add new tip with timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d")
-        new_content = current + f"\n\n## Learned {timestamp}\n- {tip}"
+        path = self._knowledge_paths[category]
         
-        path.write_text(new_content)
+        # Add new tip with timestamp. Appended in a single write rather than
+        # rewriting the file, so games running side by side (--games) can't
+        # drop each other's tips.
+        timestamp = _today()
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(f"\n\n## Learned {timestamp}\n- {tip}")
+        # Re-read on next use, which also picks up other games' tips
+        self._lt_cache.pop(path, None)
         logger.info(f"Added tip to {category}: {tip[:50]}...")
     
     def analyze_game_and_learn(self):
         """Analyze the game and extract lessons to long-term memory."""
-        if not self.short_term:
+        if not self.game_stats.total_turns:
             return
         
         lessons = []
@@ -255,8 +361,6 @@ class MemoryManager:
     
     def save_game_summary(self, outcome: str = "unknown"):
         """Save a summary of the game to long-term memory."""
-        summary_path = self.memory_dir / "game_history.jsonl"
-        
         summary = {
             "timestamp": datetime.now().isoformat(),
             "turns": self.game_stats.total_turns,
@@ -266,17 +370,28 @@ class MemoryManager:
             "strategy": self.current_strategy,
         }
         
-        with open(summary_path, "a") as f:
-            f.write(json.dumps(summary) + "\n")
+        if self._history_file is None:
+            # Line buffered, so each summary is on disk as soon as it's written
+            self._history_file = open(self._history_path, "a", buffering=1)
+            # Closed by close(), or failing that when the manager is collected
+            # or at exit; the finalizer holds the file, not the manager
+            weakref.finalize(self, self._history_file.close)
+        self._history_file.write(json.dumps(summary) + "\n")
         
         logger.info(f"Saved game summary: {outcome}")
     
+    def close(self):
+        """Close the game history file if it is open."""
+        if self._history_file is not None:
+            self._history_file.close()
+            self._history_file = None
+    
     def reset(self):
         """Reset short-term memory for new game."""
         # Save lessons from current game first
         self.analyze_game_and_learn()
         
-        self.short_term = []
+        self.short_term.clear()
         self.game_stats = GameStats()
         self.current_strategy = "economy"
         self.strategic_goals = []
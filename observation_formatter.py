@@ -7,20 +7,27 @@ This module handles:
 - Parsing AI responses into valid actions
 """
 import re
+from collections import Counter
+from functools import lru_cache
 from typing import Dict, Any, List, Optional, Tuple
 
+import numpy as np
+
 
 def simplify_observation(obs: Dict[str, Any], env=None) -> Dict[str, Any]:
     """
     Reduce observation to essential information.
     
     Args:
-        obs: Raw observation from gym environment
+        obs: Raw observation from gym environment, or a parsed GameState
         env: The gym environment (for metadata)
     
     Returns:
         Simplified dict with key information
     """
+    if hasattr(obs, "my_units"):
+        return simplify_game_state(obs)
+    
     simplified = {
         "turn": obs.get("time", 0),
         "my_units": [],
@@ -33,12 +40,7 @@ def simplify_observation(obs: Dict[str, Any], env=None) -> Dict[str, Any]:
     units = obs.get("units", [])
     for unit in units:
         if isinstance(unit, dict):
-            unit_info = {
-                "id": unit.get("id"),
-                "type": _get_unit_type(unit.get("template", "")),
-                "health": unit.get("health", 100),
-                "position": _simplify_position(unit.get("position", {})),
-            }
+            unit_info = _unit_info(unit)
             
             owner = unit.get("owner", 0)
             if owner == 1:  # Our units
@@ -59,21 +61,63 @@ def simplify_observation(obs: Dict[str, Any], env=None) -> Dict[str, Any]:
     return simplified
 
 
+def simplify_game_state(state) -> Dict[str, Any]:
+    """
+    Simplified observation straight from a ZeroADDirectClient GameState.
+    
+    Reads the already-partitioned unit lists, so no intermediate
+    observation dict has to be built per turn.
+    """
+    return {
+        "turn": state.time,
+        "my_units": [_unit_info(u) for u in state.my_units],
+        "enemy_units": [_unit_info(u) for u in state.enemy_units],
+        "resources": dict(state.resources),
+        "buildings": [],
+    }
+
+
+def observation_vector(simplified_obs: Dict[str, Any]) -> np.ndarray:
+    """
+    Numeric features of a simplified observation, for similarity matching.
+    
+    Resources, unit counts and total health on both sides, log-scaled so a
+    few extra units of wood matter less than going from 0 to 100.
+    """
+    res = simplified_obs.get("resources", {})
+    my_units = simplified_obs.get("my_units", [])
+    enemy_units = simplified_obs.get("enemy_units", [])
+    features = [
+        res.get("food", 0), res.get("wood", 0), res.get("stone", 0), res.get("metal", 0),
+        len(my_units), len(enemy_units),
+        sum(u.get("health", 100) for u in my_units) / 100,
+        sum(u.get("health", 100) for u in enemy_units) / 100,
+    ]
+    return np.log1p(np.maximum(np.array(features, dtype=np.float32), 0))
+
+
+def _unit_info(unit: Dict[str, Any]) -> Dict[str, Any]:
+    """Essential fields of a single unit."""
+    return {
+        "id": unit.get("id"),
+        "type": _get_unit_type(unit.get("template", "")),
+        "health": unit.get("health", 100),
+        "position": _simplify_position(unit.get("position", {})),
+    }
+
+
+@lru_cache(maxsize=512)
 def _get_unit_type(template: str) -> str:
     """Extract readable unit type from template string."""
     if not template:
         return "unknown"
     
     # Extract last part of template path
-    parts = template.split("/")
-    if parts:
-        name = parts[-1]
-        # Remove rank suffixes
-        for suffix in ["_a", "_b", "_c", "_e"]:
-            if name.endswith(suffix):
-                name = name[:-2]
-        return name.replace("_", " ")
-    return template
+    name = template.rpartition("/")[2]
+    # Remove rank suffixes
+    for suffix in ("_a", "_b", "_c", "_e"):
+        name = name.removesuffix(suffix)
+    return name.replace("_", " ")
 
 
 def _simplify_position(pos: Dict) -> Tuple[int, int]:
@@ -83,6 +127,13 @@ def _simplify_position(pos: Dict) -> Tuple[int, int]:
     return (0, 0)
 
 
+# Closing instruction of create_claude_prompt()
+_INSTRUCTION = """
+--- INSTRUCTION ---
+Choose ONE action number. Reply with ONLY the number, nothing else.
+Example: 2"""
+
+
 def create_claude_prompt(
     simplified_obs: Dict[str, Any],
     action_space,
@@ -101,63 +152,99 @@ def create_claude_prompt(
     Returns:
         Formatted prompt string
     """
-    lines = []
+    # Recent history (if provided)
+    history_lines = []
+    if history:
+        history_lines.append("\n--- RECENT HISTORY ---")
+        history_lines.extend(
+            f"Turn {h.get('turn')}: Action {h.get('action')} → Reward {h.get('reward', 0)}"
+            for h in history[-3:]
+        )
+    
+    return "\n".join([
+        f"=== TURN {simplified_obs.get('turn', 0)} ===",
+        *_state_lines(simplified_obs),
+        "\n--- AVAILABLE ACTIONS ---",
+        *_action_lines(action_space, action_descriptions),
+        *history_lines,
+        _INSTRUCTION,
+    ])
+
+
+def create_batch_prompt(
+    simplified_obs_list: List[Dict[str, Any]],
+    action_space,
+    action_descriptions: List[str] = None,
+) -> str:
+    """
+    Create one prompt asking for an action for each of several states.
+    
+    The action list and instructions are sent once for all states; parse
+    the reply with extract_actions_from_response().
+    """
+    lines = ["--- AVAILABLE ACTIONS ---"]
+    lines.extend(_action_lines(action_space, action_descriptions))
+    
+    for i, simplified_obs in enumerate(simplified_obs_list):
+        lines.append(f"\n=== STATE {i} (turn {simplified_obs.get('turn', 0)}) ===")
+        lines.extend(_state_lines(simplified_obs))
     
-    # Game state header
-    turn = simplified_obs.get("turn", 0)
-    lines.append(f"=== TURN {turn} ===")
+    lines.append("\n--- INSTRUCTION ---")
+    lines.append("Choose ONE action number for EACH state. Reply with one line per state")
+    lines.append("in the form <state>: <action>, nothing else.")
+    lines.append("Example:\n0: 2\n1: 4")
     
-    # Resources
+    return "\n".join(lines)
+
+
+def _state_lines(simplified_obs: Dict[str, Any]) -> List[str]:
+    """Resources and forces section of a prompt."""
     res = simplified_obs.get("resources", {})
-    lines.append(f"\nResources: Food={res.get('food', 0)}, Wood={res.get('wood', 0)}, Stone={res.get('stone', 0)}, Metal={res.get('metal', 0)}")
+    food, wood, stone, metal = res.get("food", 0), res.get("wood", 0), res.get("stone", 0), res.get("metal", 0)
     
     # My forces
     my_units = simplified_obs.get("my_units", [])
     if my_units:
-        unit_counts = {}
-        for u in my_units:
-            t = u.get("type", "unit")
-            unit_counts[t] = unit_counts.get(t, 0) + 1
+        unit_counts = Counter(u.get("type", "unit") for u in my_units)
         unit_summary = ", ".join(f"{v} {k}" for k, v in unit_counts.items())
-        lines.append(f"\nYour Forces ({len(my_units)} units): {unit_summary}")
+        mine = f"\nYour Forces ({len(my_units)} units): {unit_summary}"
     else:
-        lines.append("\nYour Forces: None visible")
+        mine = "\nYour Forces: None visible"
     
     # Enemy forces
     enemy_units = simplified_obs.get("enemy_units", [])
     if enemy_units:
-        enemy_counts = {}
-        for u in enemy_units:
-            t = u.get("type", "unit")
-            enemy_counts[t] = enemy_counts.get(t, 0) + 1
+        enemy_counts = Counter(u.get("type", "unit") for u in enemy_units)
         enemy_summary = ", ".join(f"{v} {k}" for k, v in enemy_counts.items())
-        lines.append(f"Enemy Forces ({len(enemy_units)} units): {enemy_summary}")
+        enemy = f"Enemy Forces ({len(enemy_units)} units): {enemy_summary}"
     else:
-        lines.append("Enemy Forces: None visible")
-    
-    # Available actions
-    lines.append("\n--- AVAILABLE ACTIONS ---")
+        enemy = "Enemy Forces: None visible"
     
+    return [f"\nResources: Food={food}, Wood={wood}, Stone={stone}, Metal={metal}", mine, enemy]
+
+
+def _action_lines(action_space, action_descriptions: List[str] = None) -> List[str]:
+    """Numbered action list of a prompt."""
     if action_descriptions:
-        for i, desc in enumerate(action_descriptions):
-            lines.append(f"{i}: {desc}")
-    elif hasattr(action_space, 'n'):
+        return [f"{i}: {desc}" for i, desc in enumerate(action_descriptions)]
+    if hasattr(action_space, 'n'):
         # Discrete action space
-        for i in range(min(action_space.n, 10)):
-            lines.append(f"{i}: Action {i}")
-    
-    # Recent history (if provided)
-    if history and len(history) > 0:
-        lines.append("\n--- RECENT HISTORY ---")
-        for h in history[-3:]:
-            lines.append(f"Turn {h.get('turn')}: Action {h.get('action')} → Reward {h.get('reward', 0)}")
-    
-    # Instruction
-    lines.append("\n--- INSTRUCTION ---")
-    lines.append("Choose ONE action number. Reply with ONLY the number, nothing else.")
-    lines.append("Example: 2")
-    
-    return "\n".join(lines)
+        return [f"{i}: Action {i}" for i in range(min(action_space.n, 10))]
+    return []
+
+
+# Tried in order by extract_action_from_response(), after the bare number
+# fast path. Case-insensitive, so the reply never needs lowercasing. A
+# leading "3: ..." needs no pattern of its own: the first-number search
+# finds the same digits.
+_ACTION_PATTERNS = [
+    re.compile(r'action[:\s]+(\d+)', re.IGNORECASE),  # "action: 3" or "action 3"
+    re.compile(r'choose[:\s]+(\d+)', re.IGNORECASE),  # "choose 3"
+    re.compile(r'(\d+)'),                             # First number ("3: because...", last resort)
+]
+
+# "state: action" lines of a batched answer
+_BATCH_LINE_RE = re.compile(r'(\d+)\s*:\s*(\d+)')
 
 
 def extract_action_from_response(response: str, action_space=None) -> Optional[int]:
@@ -182,6 +269,15 @@ def extract_action_from_response(response: str, action_space=None) -> Optional[i
     
     response = response.strip()
     
+    # Short reply led by the number ("3", "12.", "4:"): the patterns below
+    # would all settle on that same number, so skip them
+    if len(response) <= 3 and response[:1].isdecimal():
+        end = 1
+        while end < len(response) and response[end].isdecimal():
+            end += 1
+        action = int(response[:end])
+        return action if _is_valid_action(action, action_space) else None
+    
     # Try direct number
     if response.isdigit():
         action = int(response)
@@ -189,16 +285,8 @@ def extract_action_from_response(response: str, action_space=None) -> Optional[i
             return action
     
     # Try to find number in response
-    patterns = [
-        r'^(\d+)$',                    # Just a number
-        r'action[:\s]+(\d+)',          # "action: 3" or "action 3"
-        r'choose[:\s]+(\d+)',          # "choose 3"
-        r'^(\d+)[:\.\s]',              # "3: because..." or "3. attack"
-        r'(\d+)',                       # Any number (last resort)
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, response.lower())
+    for pattern in _ACTION_PATTERNS:
+        match = pattern.search(response)
         if match:
             action = int(match.group(1))
             if _is_valid_action(action, action_space):
@@ -207,6 +295,42 @@ def extract_action_from_response(response: str, action_space=None) -> Optional[i
     return None
 
 
+def extract_actions_from_response(
+    response: str,
+    count: int,
+    action_space=None,
+) -> List[Optional[int]]:
+    """
+    Parse a reply to create_batch_prompt() into one action per state.
+    
+    Returns a list of length count; states the reply doesn't cover, or
+    gives an invalid action for, are None.
+    """
+    actions: List[Optional[int]] = [None] * count
+    for state, action in _BATCH_LINE_RE.findall(response or ""):
+        state, action = int(state), int(action)
+        if state < count and actions[state] is None and _is_valid_action(action, action_space):
+            actions[state] = action
+    return actions
+
+
+def complete_answer(text: str) -> Optional[str]:
+    """The answer in a partial streamed response, once it can't grow any more.
+    
+    Answers are a single action number or strategy word, so they are done at
+    the first character that can't extend a leading number, or a newline.
+    """
+    text = text.lstrip()
+    if text[:1].isdigit():
+        end = 1
+        while end < len(text) and text[end].isdigit():
+            end += 1
+        return text[:end] if end < len(text) else None
+    if "\n" in text:
+        return text.split("\n", 1)[0].strip()
+    return None
+
+
 def _is_valid_action(action: int, action_space) -> bool:
     """Check if action is valid for the action space."""
     if action_space is None:
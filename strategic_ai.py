@@ -10,6 +10,7 @@ Phase 2: Tactical Execution (every turn)
 - Execute using dynamic action system
 """
 import logging
+import re
 from typing import List, Dict, Any, Optional, Tuple
 
 from memory_manager import MemoryManager, TurnEvent
@@ -19,6 +20,30 @@ from game_knowledge import GAME_KNOWLEDGE_PROMPT
 
 logger = logging.getLogger(__name__)
 
+# Input budget for a single prompt. Token counts are estimated from length
+# (~4 characters per token) to avoid a tokenizer dependency.
+MAX_INPUT_TOKENS = 1500
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for a prompt."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+# Bucket sizes for "coarse" precision, where the tactical summary is
+# quantized so nearby states produce byte-identical (cacheable) prompts
+RESOURCE_BUCKET = 50
+UNIT_BUCKET = 5
+
+# First number in a tactical answer
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def quantize(value: int, bucket: int) -> int:
+    """Round value to the nearest multiple of bucket."""
+    return int(round(value / bucket)) * bucket
+
 
 class StrategicAI:
     """
@@ -54,14 +79,19 @@ class StrategicAI:
         memory: MemoryManager,
         action_generator: DynamicActionGenerator,
         strategic_interval: int = 20,  # Re-evaluate strategy every N turns
+        precision: str = "fine",  # "fine" or "coarse" (quantized tactical summary)
+        dominance_gap: Optional[int] = 4,  # Skip the LLM when the top action leads by this much
     ):
         self.memory = memory
         self.action_generator = action_generator
         self.strategic_interval = strategic_interval
+        self.precision = precision
+        self.dominance_gap = dominance_gap
         
         self.current_strategy = "economy"
         self.last_strategic_turn = 0
         self.turn_count = 0
+        self.skipped_llm_turns = 0
     
     def should_reevaluate_strategy(self) -> bool:
         """Check if it's time to re-evaluate strategy."""
@@ -74,17 +104,17 @@ class StrategicAI:
         This asks the LLM to choose a high-level strategy.
         """
         # Count units by type
-        workers = len([u for u in state.my_units if "female" in u["name"].lower()])
-        military = len(state.my_units) - workers
+        workers, military, _ = state.unit_counts()
+        food, wood, stone, metal = (state.resources.get(r, 0) for r in ("food", "wood", "stone", "metal"))
         
         # Build state summary
         summary = f"""## Current Game Status (Turn {self.turn_count})
 
 **Resources:**
-- Food: {state.resources.get('food', 0)}
-- Wood: {state.resources.get('wood', 0)}
-- Stone: {state.resources.get('stone', 0)}
-- Metal: {state.resources.get('metal', 0)}
+- Food: {food}
+- Wood: {wood}
+- Stone: {stone}
+- Metal: {metal}
 
 **Population:** {state.population}/{state.population_limit}
 - Workers: {workers}
@@ -100,11 +130,20 @@ class StrategicAI:
 {self.memory.get_short_term_summary()}
 """
 
-        # Add knowledge context
+        # Add knowledge context, trimmed to whatever the budget leaves over
         knowledge = self.memory.get_long_term_knowledge("strategies")
-        knowledge_excerpt = knowledge[:500] if knowledge else ""
-
-        prompt = f"""You are the strategic commander for a 0 A.D. game.
+        prompt = self._format_strategic_prompt(summary, "")
+        room = (MAX_INPUT_TOKENS - estimate_tokens(prompt)) * CHARS_PER_TOKEN
+        knowledge_excerpt = knowledge[:min(500, max(0, room))] if knowledge else ""
+        
+        if knowledge_excerpt:
+            prompt = self._format_strategic_prompt(summary, knowledge_excerpt)
+        
+        return prompt
+    
+    def _format_strategic_prompt(self, summary: str, knowledge_excerpt: str) -> str:
+        """Assemble the strategic prompt from its variable parts."""
+        return f"""You are the strategic commander for a 0 A.D. game.
 
 {summary}
 
@@ -120,8 +159,6 @@ class StrategicAI:
 Based on the current game state, which strategy should we focus on?
 
 Reply with ONLY one word: ECONOMY, MILITARY, DEFENSE, or ATTACK"""
-
-        return prompt
     
     def parse_strategy_response(self, response: str) -> str:
         """Parse LLM response to get strategy."""
@@ -147,11 +184,18 @@ Reply with ONLY one word: ECONOMY, MILITARY, DEFENSE, or ATTACK"""
         strategy_info = self.STRATEGIES[self.current_strategy]
         
         # Build state summary (concise)
-        workers = len([u for u in state.my_units if "female" in u["name"].lower()])
-        military = len(state.my_units) - workers
+        workers, military, _ = state.unit_counts()
+        food, wood, stone, metal = (state.resources.get(r, 0) for r in ("food", "wood", "stone", "metal"))
+        turn = f"Turn {self.turn_count} | "
         
-        summary = f"""Turn {self.turn_count} | Strategy: {self.current_strategy.upper()}
-Resources: F={state.resources.get('food', 0)} W={state.resources.get('wood', 0)} S={state.resources.get('stone', 0)} M={state.resources.get('metal', 0)}
+        if self.precision == "coarse":
+            # Drop the turn number and bucket counts so the prompt repeats
+            food, wood, stone, metal = (quantize(v, RESOURCE_BUCKET) for v in (food, wood, stone, metal))
+            workers, military = quantize(workers, UNIT_BUCKET), quantize(military, UNIT_BUCKET)
+            turn = ""
+        
+        summary = f"""{turn}Strategy: {self.current_strategy.upper()}
+Resources: F={food} W={wood} S={stone} M={metal}
 Units: {workers} workers, {military} military | Pop: {state.population}/{state.population_limit}
 Enemy: {len(state.enemy_units)} units visible"""
 
@@ -204,14 +248,14 @@ Reply with ONLY the action number:"""
             new_strategy = self.parse_strategy_response(response)
             
             if new_strategy != self.current_strategy:
-                logger.info(f"Strategy changed: {self.current_strategy} → {new_strategy}")
+                logger.info("Strategy changed: %s → %s", self.current_strategy, new_strategy)
                 self.current_strategy = new_strategy
                 self.memory.set_strategy(new_strategy)
             
             self.last_strategic_turn = self.turn_count
         
         # Phase 2: Tactical execution
-        logger.info(f"=== Phase 2: Tactical ({self.current_strategy.upper()}) ===")
+        logger.info("=== Phase 2: Tactical (%s) ===", self.current_strategy.upper())
         
         # Generate available actions
         actions = self.action_generator.generate_actions(state)
@@ -219,49 +263,77 @@ Reply with ONLY the action number:"""
         # Filter/prioritize based on strategy
         actions = self._prioritize_for_strategy(actions)
         
-        # Get tactical decision from LLM
-        tactical_prompt = self.create_tactical_prompt(state, actions)
-        response = call_llm_func(tactical_prompt)
+        actions_by_id = self.action_generator.index_actions(actions)
         
-        # Parse action choice
-        action_id = self._parse_action_response(response, actions)
+        if self._top_action_dominates(actions):
+            # The rules already make the choice obvious; don't ask the LLM
+            action_id = actions[0].id
+            self.skipped_llm_turns += 1
+            logger.info("Top action dominates, skipping LLM: %s", actions[0].name)
+        else:
+            # Get tactical decision from LLM
+            tactical_prompt = self.create_tactical_prompt(state, actions)
+            response = call_llm_func(tactical_prompt)
+            
+            # Parse action choice
+            action_id = self._parse_action_response(response, actions, actions_by_id)
         
         # Execute action
-        commands = self.action_generator.execute_action(action_id, actions, state)
+        commands = self.action_generator.execute_action(action_id, actions_by_id, state)
         
         # Get action description for memory
-        chosen_action = next((a for a in actions if a.id == action_id), None)
+        chosen_action = actions_by_id.get(action_id)
         action_desc = chosen_action.name if chosen_action else "Unknown"
         
         return commands, action_desc
     
     def _prioritize_for_strategy(self, actions: List[DynamicAction]) -> List[DynamicAction]:
-        """Adjust action priorities based on current strategy."""
-        strategy_info = self.STRATEGIES[self.current_strategy]
-        priority_categories = strategy_info["priority_categories"]
+        """Adjust action priorities based on current strategy.
+        
+        actions must already be sorted by priority, as generate_actions()
+        returns them.
+        """
+        priority_categories = _PRIORITY_SETS[self.current_strategy]
         
+        boosted = 0
         for action in actions:
             if action.category in priority_categories:
                 action.priority += 3  # Boost priority
+                boosted += 1
         
-        # Re-sort by priority
-        actions.sort(key=lambda a: -a.priority)
+        # Re-sort by priority, unless every action (or none) was boosted and
+        # the order can't have changed
+        if 0 < boosted < len(actions):
+            actions.sort(key=lambda a: -a.priority)
         
         return actions
     
-    def _parse_action_response(self, response: str, actions: List[DynamicAction]) -> int:
+    def _top_action_dominates(self, actions: List[DynamicAction]) -> bool:
+        """Whether the highest priority action leads the runner-up by dominance_gap."""
+        if self.dominance_gap is None or not actions:
+            return False
+        if len(actions) == 1:
+            return True
+        return actions[0].priority - actions[1].priority >= self.dominance_gap
+    
+    def _parse_action_response(
+        self,
+        response: str,
+        actions: List[DynamicAction],
+        actions_by_id: Optional[Dict[int, DynamicAction]] = None,
+    ) -> int:
         """Parse LLM response to get action ID."""
-        import re
+        if actions_by_id is None:
+            actions_by_id = self.action_generator.index_actions(actions)
         
         response = response.strip()
         
         # Try to find number in response
-        match = re.search(r'\d+', response)
+        match = _DIGITS_RE.search(response)
         if match:
             action_id = int(match.group())
             # Validate it's a valid action
-            valid_ids = [a.id for a in actions]
-            if action_id in valid_ids:
+            if action_id in actions_by_id:
                 return action_id
         
         # Default to highest priority action
@@ -277,8 +349,6 @@ Reply with ONLY the action number:"""
         reward: float = 0.0,
     ):
         """Record the turn result to memory."""
-        workers = len([u for u in state.my_units if "female" in u["name"].lower()])
-        
         event = TurnEvent(
             turn=self.turn_count,
             timestamp=0,
@@ -288,7 +358,7 @@ Reply with ONLY the action number:"""
             my_units=len(state.my_units),
             my_buildings=len(state.my_buildings),
             enemy_units=len(state.enemy_units),
-            resources=dict(state.resources),
+            resources=tuple(state.resources.get(r, 0) for r in ("food", "wood", "stone", "metal")),
             outcome="",
             reward=reward,
         )
@@ -299,3 +369,11 @@ Reply with ONLY the action number:"""
         """Get current AI status for logging."""
         return (f"Turn {self.turn_count} | Strategy: {self.current_strategy.upper()} | "
                 f"Next eval in {self.strategic_interval - (self.turn_count - self.last_strategic_turn)} turns")
+
+
+# Set form of each strategy's priority_categories, for membership tests per
+# action. Kept out of STRATEGIES so the class constant stays as declared.
+_PRIORITY_SETS = {
+    name: frozenset(info["priority_categories"])
+    for name, info in StrategicAI.STRATEGIES.items()
+}
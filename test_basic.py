@@ -79,6 +79,27 @@ class TestActionParsing:
         space = MockSpace()
         assert extract_action_from_response("4", space) == 4
         assert extract_action_from_response("10", space) is None  # Out of range
+    
+    def test_streamed_answer_completion(self):
+        """Streaming stops once the answer can't grow any further."""
+        from observation_formatter import complete_answer
+        
+        assert complete_answer(" 1") is None  # could still become 12
+        assert complete_answer("12\n") == "12"
+        assert complete_answer("3 because") == "3"
+        assert complete_answer("ECON") is None
+        assert complete_answer("ECONOMY\nbecause") == "ECONOMY"
+    
+    def test_extract_batch_actions(self):
+        """Batched replies map back to their states; gaps are None."""
+        from observation_formatter import extract_actions_from_response
+        
+        class MockSpace:
+            n = 5
+        
+        response = "0: 3\n2 : 1\n1: 9\n7: 2"
+        assert extract_actions_from_response(response, 3, MockSpace()) == [3, None, 1]
+        assert extract_actions_from_response("", 2) == [None, None]
 
 
 class TestPromptCreation:
@@ -119,5 +140,321 @@ class TestConfigLoading:
         assert "logging" in config
 
 
+class TestGameStateParsing:
+    """Tests for parsing RL-interface state."""
+    
+    RAW_STATE = {
+        "timeElapsed": 1000,
+        "entities": {
+            "1": {"id": 1, "template": "structures/athen/civil_centre", "owner": 1, "position": [100, 200]},
+            "2": {"id": 2, "template": "units/athen/support_female_citizen", "owner": 1, "idle": True, "position": [110, 200]},
+            "3": {"id": 3, "template": "units/athen/support_female_citizen", "owner": 1, "idle": False, "position": [120, 200]},
+            "4": {"id": 4, "template": "units/athen/cavalry_javelinist_b", "owner": 1, "idle": True, "position": [130, 200]},
+            "5": {"id": 5, "template": "units/spart/infantry_spearman_b", "owner": 2, "position": [500, 500]},
+            "6": {"id": 6, "template": "gaia/tree/oak", "owner": 0, "position": [0, 0]},
+        },
+        "players": [
+            {},
+            {"resourceCounts": {"food": 300, "wood": 200}, "popCount": 3, "popLimit": 20},
+            {},
+        ],
+    }
+    
+    def test_parse_state_partitions_entities(self):
+        """Entities are split by owner and unit/building."""
+        from zero_ad_client import ZeroADDirectClient
+        
+        state = ZeroADDirectClient()._parse_state(self.RAW_STATE)
+        
+        assert [u["id"] for u in state.my_units] == [2, 3, 4]
+        assert [b["id"] for b in state.my_buildings] == [1]
+        assert [u["id"] for u in state.enemy_units] == [5]
+        assert state.my_units[0]["name"] == "support female citizen"
+        assert state.my_buildings[0]["position"] == {"x": 100, "z": 200}
+        assert state.resources == {"food": 300, "wood": 200, "stone": 0, "metal": 0}
+    
+    def test_unit_classification(self):
+        """Workers, military and idle workers are classified once per state."""
+        from zero_ad_client import ZeroADDirectClient, FLAG_WORKER, FLAG_MILITARY, FLAG_IDLE
+        
+        state = ZeroADDirectClient()._parse_state(self.RAW_STATE)
+        units = state.units_soa()
+        
+        assert units.ids_where(FLAG_WORKER) == [2, 3]
+        assert units.ids_where(FLAG_MILITARY) == [4]
+        assert units.ids_where(FLAG_WORKER | FLAG_IDLE) == [2]
+        assert state.unit_counts() == (2, 1, 1)
+        assert state.buildings_by_type()["civic_centre"][0]["id"] == 1
+
+
+class TestMemoryManager:
+    """Tests for short-term memory."""
+    
+    def test_short_term_summary_is_bounded(self, tmp_path):
+        """Older turns are condensed and repeated actions collapsed."""
+        from memory_manager import MemoryManager, TurnEvent
+        
+        memory = MemoryManager(memory_dir=str(tmp_path))
+        for turn in range(1, 31):
+            memory.record_turn(TurnEvent(
+                turn=turn, timestamp=0, game_time=0, action=9,
+                action_description="Wait", my_units=5, my_buildings=1,
+                enemy_units=0, resources=(100, 0, 0, 0),
+            ))
+        
+        summary = memory.get_short_term_summary()
+        
+        assert summary.splitlines() == [
+            "Recent turns:",
+            "  Earlier (turns 16-27): Wait x12",
+            "  Turns 28-30: Wait → ok (x3)",
+        ]
+    
+    def test_short_term_summary_window(self, tmp_path):
+        """The last 3 turns are listed, the 12 before them tallied in first-seen order."""
+        from memory_manager import MemoryManager, TurnEvent
+        
+        memory = MemoryManager(memory_dir=str(tmp_path))
+        for turn in range(1, 31):
+            action = "Train worker" if turn in (28, 29) else ("Gather food", "Train worker")[turn % 2]
+            memory.record_turn(TurnEvent(
+                turn=turn, timestamp=0, game_time=0, action=0,
+                action_description=action, my_units=5, my_buildings=1,
+                enemy_units=0, resources=(100, 0, 0, 0),
+                outcome="queue full" if turn == 29 else "",
+            ))
+        
+        assert len(memory.short_term) == 20
+        assert memory.get_short_term_summary().splitlines() == [
+            "Recent turns:",
+            "  Earlier (turns 16-27): Gather food x6, Train worker x6",
+            "  Turn 28: Train worker → ok",
+            "  Turn 29: Train worker → queue full",
+            "  Turn 30: Gather food → ok",
+        ]
+
+
+class TestLLMCache:
+    """Tests for the LLM response cache."""
+    
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted past maxsize."""
+        from llm_cache import LLMCache
+        
+        cache = LLMCache(maxsize=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        assert cache.get("a") == "1"  # "b" is now least recent
+        cache.set("c", "3")
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.get("c") == "3"
+    
+    def test_persists_to_sqlite(self, tmp_path):
+        """Entries survive a new cache instance on the same file."""
+        from llm_cache import LLMCache
+        
+        path = str(tmp_path / "cache.sqlite")
+        key = LLMCache.make_key("gemini", "model", "prompt")
+        cache = LLMCache(path=path)
+        cache.set(key, "4")
+        cache.close()
+        
+        reopened = LLMCache(path=path)
+        assert reopened.get(key) == "4"
+        reopened.close()
+
+    def test_similarity_cache(self):
+        """Near-duplicate vectors hit, dissimilar ones miss."""
+        from llm_cache import SimilarityCache
+        
+        cache = SimilarityCache(threshold=0.95, maxsize=2)
+        cache.set([1.0, 0.0, 0.0], 3)
+        
+        assert cache.get([1.0, 0.05, 0.0]) == 3
+        assert cache.get([0.0, 1.0, 0.0]) is None
+        assert cache.get([0.0, 0.0, 0.0]) is None
+
+
+class TestRingHistory:
+    """Tests for the policy's turn history."""
+    
+    def test_wraps_and_summarizes(self):
+        """Only the last capacity turns are kept, oldest first."""
+        from claude_policy import RingHistory
+        
+        history = RingHistory(3)
+        for turn, action in enumerate([2, 5, 5, 1], start=1):
+            history.append(turn, action, f"turn {turn}")
+            history.set_last_reward(1.5)
+        
+        assert len(history) == 3
+        assert [h.turn for h in history.recent(5)] == [2, 3, 4]
+        assert [h.observation_summary for h in history.recent(2)] == ["turn 3", "turn 4"]
+        assert history.total_reward() == 4.5
+        assert history.most_common_action() == (5, 2)
+    
+    def test_most_common_action_tie_goes_to_first_used(self):
+        """Ties are broken by first use among the kept turns, not by action number."""
+        from claude_policy import RingHistory
+        
+        history = RingHistory(4)
+        for turn, action in enumerate([3, 7, 7, 2, 2], start=1):
+            history.append(turn, action, f"turn {turn}")
+        
+        assert history.most_common_action() == (7, 2)
+
+
+class TestEndpointPool:
+    """Tests for ClaudePolicy's endpoint pool."""
+    
+    def test_concurrency_limit_is_enforced(self):
+        """No endpoint ever has more than concurrency_limit calls running."""
+        import threading
+        import time
+        from claude_policy import ClaudePolicy, Endpoint
+        
+        policy = ClaudePolicy(api_key="test-key", enable_cache=False)
+        own_endpoints = policy.endpoints
+        policy.endpoints = [Endpoint("gemini", m, None, concurrency_limit=1) for m in ("a", "b")]
+        running = {"a": 0, "b": 0}
+        peak = dict(running)
+        lock = threading.Lock()
+        
+        def call(endpoint):
+            with lock:
+                running[endpoint.model] += 1
+                peak[endpoint.model] = max(peak[endpoint.model], running[endpoint.model])
+            time.sleep(0.02)
+            with lock:
+                running[endpoint.model] -= 1
+            return "1"
+        
+        threads = [threading.Thread(target=policy._on_endpoint, args=(call,)) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert max(peak.values()) == 1
+        policy.endpoints = own_endpoints
+        policy.close()
+
+
+class TestAsyncPolicy:
+    """Tests for ClaudePolicy's async path."""
+    
+    OBS = {"time": 1, "units": [], "players": []}
+    
+    @staticmethod
+    def stub_clients(monkeypatch, policy, delays=None):
+        """Replace the policy's async clients with stubs answering "3".
+        
+        Each stub is bound to the loop it was made in, like an
+        httpx.AsyncClient, and waits delays[endpoint.model] seconds before
+        answering. Returns the list the stubs are appended to.
+        """
+        import asyncio
+        
+        class StubStream:
+            def __aiter__(self):
+                return self
+            
+            async def __anext__(self):
+                if getattr(self, "sent", False):
+                    raise StopAsyncIteration
+                self.sent = True
+                return type("Chunk", (), {"text": "3\n"})()
+            
+            async def aclose(self):
+                pass
+        
+        class StubAsyncClient:
+            def __init__(self, endpoint):
+                self.loop = asyncio.get_running_loop()
+                self.model = endpoint.model
+                self.requests = 0
+                self.closed = False
+                self.models = self
+            
+            async def generate_content_stream(self, **request):
+                if asyncio.get_running_loop() is not self.loop or self.closed:
+                    raise RuntimeError("Event loop is closed")
+                self.requests += 1
+                await asyncio.sleep((delays or {}).get(self.model, 0))
+                return StubStream()
+            
+            async def aclose(self):
+                self.closed = True
+        
+        clients = []
+        
+        def create_async_client(endpoint):
+            clients.append(StubAsyncClient(endpoint))
+            return clients[-1], clients[-1].aclose
+        
+        monkeypatch.setattr(policy, "_create_async_client", create_async_client)
+        return clients
+    
+    def test_async_client_per_event_loop(self, monkeypatch):
+        """get_action_async works across asyncio.run() calls, closing each loop's client."""
+        import asyncio
+        from claude_policy import ClaudePolicy
+        
+        policy = ClaudePolicy(api_key="test-key", enable_cache=False)
+        clients = self.stub_clients(monkeypatch, policy)
+        
+        assert asyncio.run(policy.get_action_async(self.OBS)) == 3
+        assert asyncio.run(policy.get_action_async(self.OBS)) == 3
+        assert len(clients) == 2
+        assert all(c.closed for c in clients)
+        policy.close()
+    
+    def test_close_from_another_loop(self, monkeypatch):
+        """close() outside the owning loop still closes that loop's client."""
+        import asyncio
+        from claude_policy import ClaudePolicy
+        
+        policy = ClaudePolicy(api_key="test-key", enable_cache=False)
+        clients = self.stub_clients(monkeypatch, policy)
+        loop = asyncio.new_event_loop()
+        try:
+            assert loop.run_until_complete(policy.get_action_async(self.OBS)) == 3
+            
+            async def close_policy():
+                policy.close()
+            
+            asyncio.run(close_policy())
+            assert len(clients) == 1 and clients[0].closed
+        finally:
+            loop.close()
+    
+    def test_hedge_goes_to_another_endpoint(self, monkeypatch):
+        """A slow endpoint is hedged on the next one, and never duplicated on itself."""
+        import asyncio
+        from claude_policy import ClaudePolicy, Endpoint
+        
+        policy = ClaudePolicy(api_key="test-key", enable_cache=False, hedge_delay=0.01)
+        own_endpoints = policy.endpoints
+        clients = self.stub_clients(monkeypatch, policy, delays={"slow": 5})
+        
+        policy.endpoints = [Endpoint("gemini", "slow", None)]
+        
+        async def answer_within(seconds):
+            return await asyncio.wait_for(policy.get_action_async(self.OBS), seconds)
+        
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(answer_within(0.2))
+        assert [(c.model, c.requests) for c in clients] == [("slow", 1)]
+        
+        clients.clear()
+        policy.endpoints = [Endpoint("gemini", "slow", None), Endpoint("gemini", "fast", None)]
+        assert asyncio.run(answer_within(1)) == 3
+        assert [(c.model, c.requests) for c in clients] == [("slow", 1), ("fast", 1)]
+        
+        policy.endpoints = own_endpoints
+        policy.close()
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -8,6 +8,8 @@ Includes:
 - Display helpers
 """
 import os
+import re
+import copy
 import json
 import yaml
 import logging
@@ -15,6 +17,71 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
+# libyaml's C parser when PyYAML was built with it; same results, much faster
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# orjson writes episode files several times faster and serializes NumPy
+# values natively; fall back to stdlib json when it isn't installed
+try:
+    import orjson
+    
+    def _json_dumps(data, pretty: bool = False) -> bytes:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=str, option=option)
+except ImportError:
+    def _json_dumps(data, pretty: bool = False) -> bytes:
+        if pretty:
+            return json.dumps(data, indent=2, default=str).encode()
+        return json.dumps(data, separators=(",", ":"), default=str).encode()
+
+# ${VAR} or $VAR in the config text
+_ENV_VAR_RE = re.compile(r'\$\{(\w+)\}|\$(\w+)')
+
+
+# config path -> (st_mtime_ns, st_size, raw text, substituted text, parsed YAML)
+_CONFIG_CACHE: Dict[str, tuple] = {}
+
+
+# load_config() defaults, before the config file is merged in. api_key
+# values are filled from the environment on each call.
+_DEFAULT_CONFIG = {
+    "anthropic": {
+        "api_key": "",
+        "model": "claude-sonnet-4-20250514",
+        "max_tokens": 100,
+        "temperature": 0.3,
+    },
+    "gemini": {
+        "api_key": "",
+        "model": "gemini-2.0-flash",
+    },
+    "game": {
+        "environment": "zero_ad_rl/CavalryVsInfantry-v0",
+        "render": False,
+        "max_steps_per_episode": 500,
+    },
+    "policy": {
+        "provider": "gemini",
+        "conversation_history_length": 20,
+    },
+    "logging": {
+        "level": "INFO",
+        "log_file": None,
+        "save_episodes": True,
+        "episode_dir": "./episodes/",
+    }
+}
+
+
+def _substitute_env(match: re.Match) -> str:
+    """Value of the referenced environment variable, or the text unchanged if unset."""
+    return os.environ.get(match.group(1) or match.group(2), match.group(0))
+
 
 def setup_logging(config: Dict[str, Any] = None) -> logging.Logger:
     """
@@ -63,63 +130,60 @@ def load_config(config_path: str = "config.yaml") -> Dict[str, Any]:
     Returns:
         Configuration dict
     """
-    default_config = {
-        "anthropic": {
-            "api_key": os.getenv("ANTHROPIC_API_KEY", ""),
-            "model": "claude-sonnet-4-20250514",
-            "max_tokens": 100,
-            "temperature": 0.3,
-        },
-        "gemini": {
-            "api_key": os.getenv("GEMINI_API_KEY", ""),
-            "model": "gemini-2.0-flash",
-        },
-        "game": {
-            "environment": "zero_ad_rl/CavalryVsInfantry-v0",
-            "render": False,
-            "max_steps_per_episode": 500,
-        },
-        "policy": {
-            "provider": "gemini",
-            "conversation_history_length": 20,
-        },
-        "logging": {
-            "level": "INFO",
-            "log_file": None,
-            "save_episodes": True,
-            "episode_dir": "./episodes/",
-        }
-    }
+    # Sections hold only scalars, so copying each one is a full copy (and
+    # much cheaper than deepcopy). API keys are read from the environment
+    # per call, as they may be set after import.
+    default_config = {section: dict(values) for section, values in _DEFAULT_CONFIG.items()}
+    default_config["anthropic"]["api_key"] = os.getenv("ANTHROPIC_API_KEY", "")
+    default_config["gemini"]["api_key"] = os.getenv("GEMINI_API_KEY", "")
+    
+    try:
+        st = os.stat(config_path)
+    except OSError:
+        return default_config
     
-    if os.path.exists(config_path):
-        try:
+    try:
+        # Reuse the last read and parse of this file while it is unchanged
+        # (and, for the parse, while the substituted env vars are too)
+        cached = _CONFIG_CACHE.get(config_path)
+        unchanged = cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size)
+        if unchanged:
+            raw = cached[2]
+        else:
             with open(config_path, 'r') as f:
-                content = f.read()
-                
-            # Substitute environment variables
-            for key, value in os.environ.items():
-                content = content.replace(f"${{{key}}}", value)
-                content = content.replace(f"${key}", value)
-            
-            file_config = yaml.safe_load(content)
+                raw = f.read()
+        
+        # Substitute environment variables
+        content = _ENV_VAR_RE.sub(_substitute_env, raw) if "$" in raw else raw
+        
+        if unchanged and cached[3] == content:
+            file_config = cached[4]
+        else:
+            file_config = yaml.load(content, Loader=_YamlLoader)
+            _CONFIG_CACHE[config_path] = (st.st_mtime_ns, st.st_size, raw, content, file_config)
+        
+        # Deep merge with defaults (a copy, callers may mutate the result)
+        if file_config:
+            _deep_merge(default_config, copy.deepcopy(file_config))
             
-            # Deep merge with defaults
-            if file_config:
-                _deep_merge(default_config, file_config)
-                
-        except Exception as e:
-            logging.warning(f"Could not load config from {config_path}: {e}")
+    except Exception as e:
+        logging.warning(f"Could not load config from {config_path}: {e}")
     
     return default_config
 
 
 def _deep_merge(base: Dict, override: Dict) -> Dict:
     """Deep merge override into base dict."""
-    for key, value in override.items():
-        if key in base and isinstance(base[key], dict) and isinstance(value, dict):
-            _deep_merge(base[key], value)
-        else:
-            base[key] = value
+    # Explicit stack of (base, override) pairs instead of recursing per level
+    stack = [(base, override)]
+    while stack:
+        into, source = stack.pop()
+        for key, value in source.items():
+            current = into.get(key)
+            if isinstance(current, dict) and isinstance(value, dict):
+                stack.append((current, value))
+            else:
+                into[key] = value
     return base
 
 
@@ -130,6 +194,7 @@ def save_episode(
     rewards: List[float],
     save_dir: str = "./episodes/",
     metadata: Dict = None,
+    pretty: bool = False,
 ) -> str:
     """
     Save episode data for later analysis.
@@ -141,6 +206,7 @@ def save_episode(
         rewards: List of rewards received
         save_dir: Directory to save episodes
         metadata: Additional metadata to save
+        pretty: Indent the JSON for reading by eye (larger, slower to write)
         
     Returns:
         Path to saved file
@@ -169,8 +235,8 @@ def save_episode(
     filename = f"episode_{episode_num:04d}.json"
     filepath = os.path.join(save_dir, filename)
     
-    with open(filepath, 'w') as f:
-        json.dump(episode_data, f, indent=2, default=str)
+    with open(filepath, 'wb') as f:
+        f.write(_json_dumps(episode_data, pretty))
     
     return filepath
 
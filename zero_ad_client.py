@@ -8,18 +8,117 @@ Usage:
     Start 0 AD with: pyrogenesis --rl-interface=127.0.0.1:6000
 """
 import requests
+from requests.adapters import HTTPAdapter
+import urllib3
 import json
 import logging
-from typing import Optional, Dict, Any, List
+import re
+import sys
+from typing import Optional, Dict, Any, List, Tuple, Collection
 from dataclasses import dataclass, field
 
+import numpy as np
+
+from game_knowledge import unit_kind, KIND_WORKER
+
+# orjson decodes the (large) state payload several times faster than stdlib
+# json; fall back to json when it isn't installed
+try:
+    import orjson
+    
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    json_loads = json.loads
+    
+    def json_dumps(obj: Any) -> bytes:
+        # Compact like orjson; the commands payload goes out every step
+        return json.dumps(obj, separators=(",", ":")).encode()
+
 logger = logging.getLogger(__name__)
 
+# Any of these in a template marks it as a building ("farm" also covers
+# farmstead, "centre" civil centre). Case-insensitive, so templates are
+# never lowercased just to be checked.
+_BUILDING_RE = re.compile(
+    r"house|barracks|stable|tower|wall|gate|centre|center|farm|dock|market"
+    r"|temple|fortress|storehouse|field",
+    re.IGNORECASE,
+)
+
+# Building name keywords → canonical building type, checked in order
+BUILDING_TYPES = (
+    ("civic_centre", ("civil", "centre", "center")),
+    ("barracks", ("barracks",)),
+    ("stable", ("stable",)),
+)
+
+
+def building_type(name_lc: str) -> Optional[str]:
+    """Canonical BUILDING_TYPES type for a lowercased building name, if any."""
+    for btype, keywords in BUILDING_TYPES:
+        if any(kw in name_lc for kw in keywords):
+            return btype
+    return None
+
+
+# UnitsSoA.flags bits
+FLAG_WORKER = 1
+FLAG_MILITARY = 2
+FLAG_IDLE = 4
+
+
+@dataclass(slots=True)
+class UnitsSoA:
+    """
+    Struct-of-arrays view of a unit list.
+    
+    One NumPy array per field, index-aligned with the source list, so
+    per-turn scans and counts run over contiguous arrays instead of dicts.
+    """
+    ids: np.ndarray    # int64 entity ids
+    kind: np.ndarray   # uint8 game_knowledge KIND_* codes
+    idle: np.ndarray   # bool
+    flags: np.ndarray  # uint8 FLAG_* bits
+    
+    @classmethod
+    def from_units(cls, units: List[Dict]) -> "UnitsSoA":
+        """Build the arrays from parsed unit dicts in one pass."""
+        ids, kind, idle = [], [], []
+        for u in units:
+            ids.append(u["id"])
+            kind.append(u["kind"] if "kind" in u else unit_kind(u.get("template", "")))
+            idle.append(bool(u.get("idle", False)))
+        return cls.from_columns(ids, kind, idle)
+    
+    @classmethod
+    def from_columns(cls, ids: List[int], kind: List[int], idle: List[bool]) -> "UnitsSoA":
+        """Build the arrays from per-field lists, index-aligned."""
+        kind = np.array(kind, dtype=np.uint8)
+        idle = np.array(idle, dtype=bool)
+        flags = np.where(kind == KIND_WORKER, FLAG_WORKER, FLAG_MILITARY).astype(np.uint8)
+        flags |= idle.astype(np.uint8) * FLAG_IDLE
+        
+        return cls(
+            ids=np.array(ids, dtype=np.int64),
+            kind=kind,
+            idle=idle,
+            flags=flags,
+        )
+    
+    def ids_where(self, flags: int) -> List[int]:
+        """Ids of the units that have all the given FLAG_* bits set."""
+        return self.ids[(self.flags & flags) == flags].tolist()
+    
+    def __len__(self) -> int:
+        return len(self.ids)
 
-@dataclass
+
+@dataclass(slots=True)
 class GameState:
     """Current game state from 0 AD."""
-    entities: List[Dict[str, Any]] = field(default_factory=list)
+    # Raw entities as received: a list, or the payload dict's values() view
+    entities: Collection[Dict[str, Any]] = field(default_factory=list)
     players: List[Dict[str, Any]] = field(default_factory=list)
     time: float = 0.0
     
@@ -31,6 +130,43 @@ class GameState:
     resources: Dict[str, int] = field(default_factory=dict)
     population: int = 0
     population_limit: int = 0
+    
+    # Cached result of units_soa()
+    _units_soa: Optional[UnitsSoA] = field(default=None, init=False, repr=False, compare=False)
+    # Cached result of buildings_by_type()
+    _building_index: Optional[Dict[str, List[Dict]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    
+    def units_soa(self) -> UnitsSoA:
+        """Our units as a struct of arrays, built once per state."""
+        if self._units_soa is None:
+            self._units_soa = UnitsSoA.from_units(self.my_units)
+        return self._units_soa
+    
+    def unit_counts(self) -> Tuple[int, int, int]:
+        """Count (workers, military, idle_workers) over the unit arrays."""
+        units = self.units_soa()
+        is_worker = units.kind == KIND_WORKER
+        n_workers = int(np.count_nonzero(is_worker))
+        n_idle = int(np.count_nonzero(is_worker & units.idle))
+        return n_workers, len(units) - n_workers, n_idle
+    
+    def buildings_by_type(self) -> Dict[str, List[Dict]]:
+        """
+        Index our buildings by canonical type (see BUILDING_TYPES).
+        
+        Built in a single pass on first use and cached. Buildings that match
+        no type are left out.
+        """
+        if self._building_index is None:
+            index: Dict[str, List[Dict]] = {}
+            for b in self.my_buildings:
+                btype = b["btype"] if "btype" in b else building_type(b["name"].lower())
+                if btype is not None:
+                    index.setdefault(btype, []).append(b)
+            self._building_index = index
+        return self._building_index
 
 
 class ZeroADDirectClient:
@@ -47,9 +183,23 @@ class ZeroADDirectClient:
         self.base_url = f"http://{host}:{port}"
         self.player_id = player_id
         self.session = requests.Session()
+        # One game, one connection: a small pool kept alive across steps, and
+        # headers set once instead of merged into every request
+        self.session.mount(self.base_url, HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0))
+        self.session.headers.update({"Content-Type": "application/json", "Connection": "keep-alive"})
+        # step() runs every tick, so it skips requests' per-call preparation
+        # and posts through a bare urllib3 pool. No retries, as a replayed
+        # /step would advance the game.
+        self._step_pool = urllib3.HTTPConnectionPool(
+            host, port, maxsize=4, retries=False,
+            headers={"Content-Type": "application/json"},
+        )
         self.timeout = 30
         self.connected = False
         self.game_started = False
+        # template -> (name, is_building, kind, building type);
+        # templates repeat across entities and turns, so classify each once
+        self._template_info: Dict[str, Tuple[str, bool, int, Optional[str]]] = {}
     
     def connect(self) -> bool:
         """Test connection to 0 AD."""
@@ -86,12 +236,11 @@ class ZeroADDirectClient:
         try:
             response = self.session.post(
                 f"{self.base_url}/reset",
-                json=config,
-                headers={"Content-Type": "application/json"},
+                data=json_dumps(config),
                 timeout=self.timeout
             )
             response.raise_for_status()
-            data = response.json()
+            data = json_loads(response.content)
             self.game_started = True
             logger.info("Game reset successfully")
             return self._parse_state(data)
@@ -109,24 +258,17 @@ class ZeroADDirectClient:
         try:
             if commands:
                 payload = {"commands": [{"player": self.player_id, **cmd} for cmd in commands]}
-                response = self.session.post(
-                    f"{self.base_url}/step",
-                    json=payload,
-                    headers={"Content-Type": "application/json"},
-                    timeout=self.timeout
-                )
+                body = json_dumps(payload)
             else:
-                response = self.session.post(
-                    f"{self.base_url}/step",
-                    data="",
-                    timeout=self.timeout
-                )
+                body = b""
+            response = self._step_pool.urlopen("POST", "/step", body=body, timeout=self.timeout)
             
-            response.raise_for_status()
-            data = response.json()
+            if response.status >= 400:
+                raise requests.HTTPError(f"{response.status} Error for url: {self.base_url}/step")
+            data = json_loads(response.data)
             return self._parse_state(data)
         except Exception as e:
-            logger.error(f"Step failed: {e}")
+            logger.error("Step failed: %s", e)
             raise
     
     def _parse_state(self, data: Dict) -> GameState:
@@ -134,10 +276,10 @@ class ZeroADDirectClient:
         # Entities is a DICT with entity IDs as string keys
         entities_dict = data.get("entities", {})
         
-        # Convert dict to list of entities
+        # Iterate the dict's values in place rather than copying them to a list
         entities_list = []
         if isinstance(entities_dict, dict):
-            entities_list = list(entities_dict.values())
+            entities_list = entities_dict.values()
         elif isinstance(entities_dict, list):
             entities_list = entities_dict
         
@@ -147,49 +289,81 @@ class ZeroADDirectClient:
             time=data.get("timeElapsed", 0),  # Note: timeElapsed not time
         )
         
+        # Columns of state.units_soa(), filled while our units are parsed
+        # instead of in a second pass over the dicts
+        ids, kinds, idles = [], [], []
+        
+        # Hoisted out of the loop, which runs for every entity every step
+        player_id = self.player_id
+        template_info = self._template_info
+        intern = sys.intern
+        my_units, my_buildings = state.my_units, state.my_buildings
+        enemy_units, enemy_buildings = state.enemy_units, state.enemy_buildings
+        
         # Parse entities
         for entity in entities_list:
             if not isinstance(entity, dict):
                 continue
             
-            owner = entity.get("owner", 0)
-            template = entity.get("template", "")
+            # owner 0 = Gaia (resources, animals, etc)
+            # owner 1 = Player 1 (usually us)
+            # owner 2+ = Other players (enemies)
+            # Gaia is most of the map and never reported, so drop it before
+            # building anything
+            get = entity.get
+            owner = get("owner", 0)
+            if owner <= 0:
+                continue
+            template = get("template", "")
             if not template:
                 continue
             
             # Position is [x, z] array, not a dict
-            pos = entity.get("position", [0, 0])
+            pos = get("position", [0, 0])
             if isinstance(pos, list) and len(pos) >= 2:
                 position = {"x": pos[0], "z": pos[1]}
             elif isinstance(pos, dict):
-                position = pos
+                # Normalise so consumers can index x/z directly
+                position = {"x": pos.get("x", 0), "z": pos.get("z", 0)}
             else:
                 position = {"x": 0, "z": 0}
             
+            # Templates repeat across entities and turns; intern them so
+            # equal templates share one string object
+            template = intern(template)
+            classified = template_info.get(template)
+            if classified is None:
+                classified = self._classify_template(template)
+                template_info[template] = classified
+            name, is_building, kind, btype = classified
+            entity_id = get("id")
+            health = get("hitpoints", 100)
+            idle = get("idle", False)
             info = {
-                "id": entity.get("id"),
+                "id": entity_id,
                 "template": template,
-                "name": self._extract_name(template),
-                "health": entity.get("hitpoints", 100),
+                "name": name,
+                "kind": kind,
+                "btype": btype,  # None for units
+                "health": health,
                 "position": position,
-                "idle": entity.get("idle", False),
+                "idle": idle,
             }
             
-            is_building = self._is_building(template)
-            
-            # owner 0 = Gaia (resources, animals, etc)
-            # owner 1 = Player 1 (usually us)
-            # owner 2+ = Other players (enemies)
-            if owner == self.player_id:
-                if is_building:
-                    state.my_buildings.append(info)
-                else:
-                    state.my_units.append(info)
-            elif owner > 0 and owner != self.player_id:
+            if owner == player_id:
                 if is_building:
-                    state.enemy_buildings.append(info)
+                    my_buildings.append(info)
                 else:
-                    state.enemy_units.append(info)
+                    my_units.append(info)
+                    ids.append(entity_id)
+                    kinds.append(kind)
+                    idles.append(bool(idle))
+            elif is_building:
+                enemy_buildings.append(info)
+            else:
+                enemy_units.append(info)
+        
+        state._units_soa = UnitsSoA.from_columns(ids, kinds, idles)
         
         # Parse player resources
         if len(state.players) > self.player_id:
@@ -205,28 +379,32 @@ class ZeroADDirectClient:
                 state.population = player.get("popCount", 0)
                 state.population_limit = player.get("popLimit", 0)
         
-        logger.info(f"Parsed: {len(state.my_units)} units, {len(state.my_buildings)} buildings, "
-                   f"vs {len(state.enemy_units)} enemy units")
+        logger.info("Parsed: %d units, %d buildings, vs %d enemy units",
+                    len(state.my_units), len(state.my_buildings), len(state.enemy_units))
         
         return state
     
+    def _classify_template(self, template: str) -> Tuple[str, bool, int, Optional[str]]:
+        """Name, building flag, unit kind and building type of a template.
+        
+        The only place a template string is scanned; _parse_state() memoizes
+        the result per template.
+        """
+        name = self._extract_name(template)
+        if self._is_building(template):
+            return name, True, -1, building_type(name.lower())
+        return name, False, unit_kind(template), None
+    
     def _extract_name(self, template: str) -> str:
         """Get readable name from template."""
-        parts = template.split("/")
-        if parts:
-            name = parts[-1]
-            for suffix in ["_a", "_b", "_c", "_e"]:
-                if name.endswith(suffix):
-                    name = name[:-2]
-            return name.replace("_", " ")
-        return template
+        name = template.rpartition("/")[2]
+        for suffix in ("_a", "_b", "_c", "_e"):
+            name = name.removesuffix(suffix)
+        return name.replace("_", " ")
     
     def _is_building(self, template: str) -> bool:
         """Check if template is a building."""
-        keywords = ["house", "barracks", "stable", "tower", "wall", "gate",
-                   "centre", "center", "farm", "dock", "market", "temple",
-                   "fortress", "storehouse", "farmstead", "field"]
-        return any(kw in template.lower() for kw in keywords)
+        return _BUILDING_RE.search(template) is not None
     
     def _default_game_config(self) -> Dict:
         """Default game configuration."""
@@ -260,6 +438,7 @@ class ZeroADDirectClient:
     def close(self):
         """Close the session."""
         self.session.close()
+        self._step_pool.close()
         self.connected = False
 
 